@@ -1,18 +1,71 @@
 import os
+import re
+import bisect
 import time
 import pandas as pd
 import numpy as np
 from cassandra.cluster import Cluster
-from cassandra.query import BatchStatement
+from cassandra.concurrent import execute_concurrent, execute_concurrent_with_args
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
 from cassandra import ConsistencyLevel
+from cms_dataset import read_dataset, slice_records, read_normalized_dataset, slice_normalized, split_records, student_boundary
+from cms_snapshot import snapshot_key, save_snapshot, restore_snapshot
 
+# Dataset path: the generated CSV, or a Parquet/Arrow file written with output_format in faker_code_1mil.py
 dataset = "1_mil_records.csv"
+
+# Normalized export (export_mode = "normalized" in faker_code_1mil.py): load the per-table files instead of `dataset`
+NORMALIZED = False
+normalized_dataset = "1_mil_records_{table}.csv"
+
+# Benchmark sizes. With INCREMENTAL the loaded data is kept between sizes and only the records
+# [previous size, size) are appended, instead of tearing down and reloading every size from scratch
+SIZES = [250000, 500000, 750000, 1000000]
+INCREMENTAL = False
+
+# Snapshot cache (cms_snapshot.py): after ingest the Cassandra volume is saved under a key of the dataset hash, the
+# size and the schema variant, and later runs restore it instead of re-ingesting. Needs docker access to the container
+SNAPSHOTS = False
+
+# Ingest mode: "batch" (logged QUORUM batches of 100 statements) or "async" (prepared inserts table by table through
+# execute_concurrent_with_args, keeping at most LOAD_CONCURRENCY requests in flight). Every table is keyed by its
+# unique id, so no two rows share a partition; with UNLOGGED_BATCHES the async mode instead groups the rows by the
+# token range that owns their partition key and sends UNLOGGED batches of up to UNLOGGED_BATCH_SIZE rows, each of
+# which a single replica set applies
+LOAD_MODE = "batch"
+LOAD_CONCURRENCY = 128
+LOAD_CONSISTENCY = "ONE"
+UNLOGGED_BATCHES = False
+UNLOGGED_BATCH_SIZE = 50
+
+# Reset before a full load: "drop_keyspace" (drop and recreate the keyspace and tables) or "truncate" (TRUNCATE every
+# table of an existing keyspace, which keeps the schema and avoids the schema agreement round of a drop)
+RESET_MODE = "drop_keyspace"
+RESET_TIMEOUT = 120
+
+# Plan capture: after the timings of every (query, size), run the query once with query tracing and record the
+# access path, live rows and tombstones read and the trace duration of its statements next to the timings
+CAPTURE_PLANS = True
+TRACE_WAIT = 10
+
+# Longest text Excel keeps in a cell
+EXCEL_CELL_LIMIT = 32767
+
+# Large-result mode: time the queries with their statements paged FETCH_SIZE rows at a time, the next page requested
+# asynchronously while the rows of the current one are read, and report the time to the first row of a query's last
+# statement next to the time to its last row
+LARGE_RESULT_MODE = False
+FETCH_SIZE = 1000
+
 save_dir = "/app/output"
 os.makedirs(save_dir, exist_ok=True)
 
+# Cassandra connection
+CASSANDRA_HOST = "172.18.0.4"
+
 # Function to connect to Cassandra
 def connect_to_cassandra():
-    cluster = Cluster(["172.18.0.4"], port=9042)
+    cluster = Cluster([CASSANDRA_HOST], port=9042)
     session = cluster.connect()
     print("Connected to Cassandra")
     return session
@@ -66,10 +119,24 @@ def create_tables(session):
     """)
     print("Tables created successfully.")
 
-# Function to load dataset and insert data using batch processing
-def insert_data_from_csv(session, dataset, num_records):
-    df = pd.read_csv(dataset, nrows=num_records)
-    
+# Function to reset the keyspace to empty tables with RESET_MODE and return the reset time in seconds
+def reset_keyspace(session):
+    start_time = time.time()
+    if RESET_MODE == "truncate":
+        create_keyspace(session)
+        create_tables(session)
+        for table_name in TABLE_COLUMNS:
+            session.execute(f"TRUNCATE {table_name};", timeout=RESET_TIMEOUT)
+    else:
+        session.execute("DROP KEYSPACE IF EXISTS course_management_system;", timeout=RESET_TIMEOUT)
+        create_keyspace(session)
+        create_tables(session)
+    reset_time = time.time() - start_time
+    print(f"Keyspace reset ({RESET_MODE}) in {reset_time:.2f} s.")
+    return reset_time
+
+# Function to insert the data using batch processing
+def insert_data(session, df):
     # Prepare statements
     insert_courses = session.prepare("""
         INSERT INTO Courses (course_id, course_name, course_content) VALUES (?, ?, ?);
@@ -107,12 +174,106 @@ def insert_data_from_csv(session, dataset, num_records):
     if len(batch) > 0:
         execute_batch()
 
-    print(f"Data inserted from first {num_records} records...")
+    print(f"Data inserted from first {len(df)} records...")
+
+# Columns of each table, in insertion order
+TABLE_COLUMNS = {
+    "Courses": ["course_id", "course_name", "course_content"],
+    "Students": ["student_id", "student_name", "student_email_address", "course_id"],
+    "Assignments": ["assignment_id", "assignment_title", "submission_status", "score", "student_id", "course_id"],
+    "Professors": ["professor_id", "professor_name", "professor_email_address", "course_id"]
+}
+
+# Function to prepare the insert statement of each table
+def prepare_inserts(session):
+    return {
+        table_name: session.prepare(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))});"
+        )
+        for table_name, columns in TABLE_COLUMNS.items()
+    }
+
+# Function to insert the normalized tables table by table, so each course is written once
+def insert_normalized_data(session, tables, batch_size=100):
+    inserts = prepare_inserts(session)
+
+    for table_name, columns in TABLE_COLUMNS.items():
+        batch = BatchStatement(consistency_level=ConsistencyLevel.QUORUM)
+        for row in tables[table_name.lower()][columns].itertuples(index=False, name=None):
+            batch.add(inserts[table_name], row)
+            if len(batch) >= batch_size:
+                session.execute(batch)
+                batch.clear()
+        if len(batch) > 0:
+            session.execute(batch)
+
+    print(f"Normalized data inserted for {len(tables['students'])} students...")
+
+# Function to find the token range (the index of its end token on the ring) that owns a bound statement
+def token_range(token_map, bound):
+    token = token_map.token_class.from_key(bound.routing_key)
+    return bisect.bisect_left(token_map.ring, token) % len(token_map.ring)
+
+# Function to group the rows of a table into UNLOGGED batches by token range. A batch is sent as soon as it holds
+# UNLOGGED_BATCH_SIZE rows, so at most one open batch per token range is kept in memory
+def token_range_batches(session, statement, rows, consistency_level):
+    token_map = session.cluster.metadata.token_map
+    batches = {}
+    for row in rows:
+        bound = statement.bind(row)
+        key = token_range(token_map, bound)
+        batch = batches.get(key)
+        if batch is None:
+            batch = batches[key] = BatchStatement(batch_type=BatchType.UNLOGGED, consistency_level=consistency_level)
+        batch.add(bound)
+        if len(batch) >= UNLOGGED_BATCH_SIZE:
+            del batches[key]
+            yield batch, None
+
+    for batch in batches.values():
+        yield batch, None
+
+# Function to insert the normalized tables asynchronously. The rows are streamed to the driver, which keeps
+# LOAD_CONCURRENCY requests in flight, and the results are consumed as they complete so memory stays flat
+def insert_data_async(session, tables):
+    inserts = prepare_inserts(session)
+    consistency_level = getattr(ConsistencyLevel, LOAD_CONSISTENCY)
+
+    for table_name, columns in TABLE_COLUMNS.items():
+        statement = inserts[table_name]
+        statement.consistency_level = consistency_level
+        rows = tables[table_name.lower()][columns].itertuples(index=False, name=None)
+
+        if UNLOGGED_BATCHES:
+            results = execute_concurrent(session, token_range_batches(session, statement, rows, consistency_level),
+                                         concurrency=LOAD_CONCURRENCY, results_generator=True)
+        else:
+            results = execute_concurrent_with_args(session, statement, rows,
+                                                   concurrency=LOAD_CONCURRENCY, results_generator=True)
+        for _ in results:
+            pass
+
+    print(f"Data inserted asynchronously for {len(tables['students'])} students...")
+
+# Function to load the records [start, stop) with the configured LOAD_MODE and return the elapsed seconds
+def ingest(session, data, start, stop):
+    start_time = time.time()
+
+    if LOAD_MODE == "async":
+        insert_data_async(session, slice_normalized(data, start, stop) if NORMALIZED else split_records(slice_records(data, start, stop)))
+    elif NORMALIZED:
+        insert_normalized_data(session, slice_normalized(data, start, stop))
+    else:
+        insert_data(session, slice_records(data, start, stop))
+
+    ingest_time = time.time() - start_time
+    print(f"Ingested {stop - start} records in {ingest_time:.2f} s ({(stop - start) / ingest_time:.0f} rows/s).")
+    return ingest_time
 
 # Query functions for Cassandra
 def query_1(session):
     query = "SELECT student_id, student_name FROM Students WHERE course_id = 100015 LIMIT 10 ALLOW FILTERING;"
-    return session.execute(query)
+    return list(session.execute(query))
 
 def query_2(session):
     # Step 1: Getting student IDs from Assignments
@@ -122,12 +283,12 @@ def query_2(session):
     # Step 2: Getting student details from Students
     if student_ids:
         retrieve_query = f"SELECT student_id, student_name FROM Students WHERE course_id = 100015 AND student_id IN ({', '.join(map(str, student_ids))}) ALLOW FILTERING;"
-        return session.execute(retrieve_query)
+        return list(session.execute(retrieve_query))
     return []
 
 def query_3(session):
-    # Step 1: Updating Assignments
-    update_query = "UPDATE Assignments SET submission_status = 'Yes', score = 30 WHERE assignment_id IN (167615, 149316);"
+    # Step 1: Updating the assignments of Vidhya Harini and Nuthan Puli (the reserved fixed_assignment_ids of faker_code_1mil.py)
+    update_query = "UPDATE Assignments SET submission_status = 'Yes', score = 30 WHERE assignment_id IN (1100000, 1100001);"
     session.execute(update_query)
     
     # Step 2: Fetching updated student and course data
@@ -156,10 +317,116 @@ def query_4(session):
         return list(students), list(courses)
     return [], []
 
-# Function to run the query and measure execution times
-def run_query(session, query_func):
+# Session wrapper handed to a query function to run each of its statements with query tracing and keep the traces
+class TracingSession:
+    def __init__(self, session):
+        self.session = session
+        self.traces = []
+
+    def execute(self, query, parameters=None):
+        result = self.session.execute(query, parameters, trace=True)
+        self.traces.append((query, result.get_query_trace(max_wait_sec=TRACE_WAIT)))
+        return result
+
+# Function to get the access path of a traced statement: a single-partition read, a range scan over the token ranges
+# (what ALLOW FILTERING on a non-key column does) or a write
+def trace_access(events):
+    descriptions = [event.description for event in events]
+    if any(description.startswith("Executing single-partition query") for description in descriptions):
+        return "single-partition"
+    if any("range" in description.lower() for description in descriptions):
+        return "range scan"
+    return "write" if any("mutation" in description.lower() for description in descriptions) else "other"
+
+# Function to capture the plan of a query once from the traces of its statements
+def capture_plan(session, query_func):
+    tracing_session = TracingSession(session)
+    query_func(tracing_session)
+
+    summaries, rows_read, tombstones, duration, indexes, plan_lines = [], 0, 0, 0, set(), []
+    for query, trace in tracing_session.traces:
+        statement = " ".join(query.split())
+        table = re.search(r"(?:FROM|UPDATE)\s+(\w+)", statement, re.IGNORECASE)
+        statement_rows = 0
+        for event in trace.events:
+            read = re.search(r"Read (\d+) live rows and (\d+) tombstone cells", event.description)
+            if read:
+                statement_rows += int(read.group(1))
+                tombstones += int(read.group(2))
+            if "index" in event.description.lower():
+                indexes.add(event.description)
+
+        rows_read += statement_rows
+        duration += trace.duration.total_seconds() * 1e6
+        summaries.append(f"{table.group(1) if table else '?'}:{trace_access(trace.events)}({statement_rows} rows)")
+        plan_lines.append(f"{statement} -- {trace.duration.total_seconds() * 1e6:.0f} us")
+        plan_lines += [f"  [{event.source_elapsed.total_seconds() * 1e6 if event.source_elapsed else 0:.0f} us] "
+                       f"{event.source} {event.description}" for event in trace.events]
+
+    return {
+        "Plan Summary": " | ".join(summaries),
+        "Rows Read": rows_read,
+        "Tombstones Read": tombstones,
+        "Trace Duration (us)": duration,
+        "Indexes Used": ", ".join(sorted(indexes)),
+        "Execution Plan": "\n".join(plan_lines)[:EXCEL_CELL_LIMIT]
+    }
+
+# Session wrapper handed to a query function to page each of its statements asynchronously, keeping the time the first
+# page of the latest statement arrived
+class StreamingSession:
+    def __init__(self, session):
+        self.session = session
+        self.first_row_time = None
+
+    def execute(self, query, parameters=None):
+        future = self.session.execute_async(SimpleStatement(query, fetch_size=FETCH_SIZE), parameters)
+        page = future.result()
+        self.first_row_time = time.time()
+        return self.rows(future, page)
+
+    # Function to yield the rows page by page, fetching the next page before the rows of the current one are read
+    @staticmethod
+    def rows(future, page):
+        while True:
+            rows, has_more_pages = page.current_rows, page.has_more_pages
+            if has_more_pages:
+                future.start_fetching_next_page()
+            yield from rows
+            if not has_more_pages:
+                return
+            page = future.result()
+
+# Function to run a query through a StreamingSession and measure the times to its first and last rows, in milliseconds
+def stream_query(session, query_func):
+    streaming_session = StreamingSession(session)
     start_time = time.time()
+    query_func(streaming_session)
+    end_time = time.time()
+    return (streaming_session.first_row_time - start_time) * 1000, (end_time - start_time) * 1000
+
+# Function to get first and average times to the last row of a streamed query, with those to its first row
+def run_streaming_experiments(stream_func, num_experiments=31):
+    timings = [stream_func() for _ in range(num_experiments)]
+    first_row_times = [first_row_time for first_row_time, _ in timings]
+    execution_times = [last_row_time for _, last_row_time in timings]
+    return execution_times, execution_times[0], np.mean(execution_times[1:]), {
+        "First Time To First Row (ms)": first_row_times[0],
+        "Average Time To First Row (ms)": np.mean(first_row_times[1:])
+    }
+
+# Function to count the rows and bytes of a query's results over one more execution. The driver does not count the
+# bytes it receives, so the bytes are the UTF-8 size of the returned values
+def result_size(session, query_func):
     result = query_func(session)
+    rows = [row for part in result for row in part] if isinstance(result, tuple) else result
+    return len(rows), sum(len(str(value).encode()) for row in rows for value in row)
+
+# Function to run the query and measure execution times, up to the last row of its result (every query function
+# returns its rows as lists, which reads all the pages)
+def run_query(session, query_func):
+    start_time = time.time()
+    query_func(session)
     end_time = time.time()
     return (end_time - start_time) * 1000  # return time in milliseconds
 
@@ -181,20 +448,43 @@ def main():
     # Connecting to Cassandra
     session = connect_to_cassandra()
 
+    # Loading the dataset once; every size is a slice of it
+    if NORMALIZED:
+        data = read_normalized_dataset(normalized_dataset)
+    else:
+        data = read_dataset(dataset)
+
     # DataFrame to store experiment results
     results = []
 
     # Running for different data sizes
-    for num_records in [250000, 500000, 750000, 1000000]:
+    for i, num_records in enumerate(SIZES):
         print(f"Running experiments for {num_records} records...")
+        # Increments start and stop on student boundaries, so no student is split between two of them
+        start = student_boundary(data, SIZES[i - 1]) if INCREMENTAL and i > 0 else 0
+        stop = student_boundary(data, num_records)
 
-        # Dropping the keyspace and tables
-        session.execute("DROP KEYSPACE IF EXISTS course_management_system;")
-        create_keyspace(session)
-        create_tables(session)
+        # Restoring the loaded data from a snapshot, or ingesting it (and saving a snapshot)
+        key = snapshot_key(normalized_dataset if NORMALIZED else dataset, num_records,
+                           "normalized" if NORMALIZED else "denormalized", LOAD_MODE) if SNAPSHOTS else None
+        ingest_time = restore_snapshot('cassandra', key, CASSANDRA_HOST) if key else None
+        restored = ingest_time is not None
+        reset_time = 0
+        if not restored:
+            # Emptying the keyspace before a full load
+            if start == 0:
+                reset_time = reset_keyspace(session)
+
+            # Inserting data
+            ingest_time = ingest(session, data, start, stop)
+            if key:
+                save_snapshot('cassandra', key, CASSANDRA_HOST)
 
-        # Inserting data
-        insert_data_from_csv(session, dataset, num_records)
+        # Reconnecting after the container restart of a snapshot
+        if key:
+            session.cluster.shutdown()
+            session = connect_to_cassandra()
+            session.set_keyspace("course_management_system")
 
         # Running experiments for each query
         for query_name, query_func in {
@@ -204,14 +494,32 @@ def main():
             "query_4": query_4
         }.items():
             print(f"Running {query_name} for {num_records} records...")
-            execution_times, first_execution_time, avg_execution_time = run_experiments(session, query_func)
+            if LARGE_RESULT_MODE:
+                execution_times, first_execution_time, avg_execution_time, stream_info = run_streaming_experiments(
+                    lambda: stream_query(session, query_func))
+            else:
+                execution_times, first_execution_time, avg_execution_time = run_experiments(session, query_func)
+                stream_info = {}
+
+            # Capturing the plan after the timings, so it does not warm up the first execution
+            plan_info = capture_plan(session, query_func) if CAPTURE_PLANS else {}
+            result_rows, result_bytes = result_size(session, query_func)
 
             # Adding results to the DataFrame
             results.append({
                 "Records": num_records,
                 "Query": query_name,
                 "First Execution Time (ms)": first_execution_time,
-                "Average Execution Time (ms)": avg_execution_time
+                "Average Execution Time (ms)": avg_execution_time,
+                "Result Rows": result_rows,
+                "Result Bytes": result_bytes,
+                **stream_info,
+                "Ingested Records": stop - start,
+                "Ingest Time (s)": ingest_time,
+                "Ingest Rows/s": (stop - start) / ingest_time,
+                "Restored From Snapshot": restored,
+                "Reset Time (s)": reset_time,
+                **plan_info
             })
 
         print(f"Experiment for {num_records} records completed.")
@@ -0,0 +1,94 @@
+import glob
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Shared dataset access for the benchmark scripts. The dataset can be the generated CSV, a Parquet file or an
+# Arrow IPC file, or a glob over the part files of a sharded generation (e.g. '1_mil_records.part*.arrow').
+
+# Tables of the normalized export written by faker_code_1mil.py with export_mode = "normalized", with their columns
+NORMALIZED_TABLES = {
+    'courses': ['course_id', 'course_name', 'course_content'],
+    'students': ['student_id', 'student_name', 'student_email_address', 'course_id'],
+    'professors': ['professor_id', 'professor_name', 'professor_email_address', 'course_id'],
+    'assignments': ['assignment_id', 'assignment_title', 'submission_status', 'score', 'student_id', 'course_id']
+}
+
+# Function to load the dataset. Arrow IPC files are memory-mapped, so nothing is read until a slice is used
+def read_dataset(path):
+    paths = sorted(glob.glob(path)) or [path]
+    extension = os.path.splitext(paths[0])[1]
+
+    if extension == '.csv':
+        return pd.concat([pd.read_csv(p) for p in paths], ignore_index=True)
+
+    if extension == '.parquet':
+        tables = [pq.read_table(p, memory_map=True) for p in paths]
+    else:
+        tables = [pa.ipc.open_file(pa.memory_map(p, 'r')).read_all() for p in paths]
+    return pa.concat_tables(tables)
+
+# Function to get the number of records in the dataset
+def count_records(data):
+    return len(data) if isinstance(data, pd.DataFrame) else data.num_rows
+
+# Function to get the records [start, stop) as a DataFrame. Arrow tables are sliced zero-copy and only the
+# requested range is converted
+def slice_records(data, start, stop):
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[start:stop]
+    return data.slice(start, stop - start).to_pandas()
+
+# Function to move a record position forward to the first record of a student, so the ranges [start, stop) of an
+# incremental load never split the records of a student with several assignments between two increments. The
+# normalized tables are already sliced by student, so their positions are kept
+def student_boundary(data, position):
+    if isinstance(data, dict):
+        return position
+
+    total = count_records(data)
+    while 0 < position < total:
+        previous_id, student_id = slice_records(data, position - 1, position + 1)['student_id'].tolist()
+        if previous_id != student_id:
+            break
+        position += 1
+    return position
+
+# Function to load the normalized export. `pattern` names the table files, e.g. '1_mil_records_{table}.csv'. The
+# assignments are ordered by the position of their student once, and 'assignment_offsets' holds the first assignment
+# row of every student position, so the assignments of a student range are one contiguous slice
+def read_normalized_dataset(pattern):
+    tables = {table: read_dataset(pattern.format(table=table)) for table in NORMALIZED_TABLES}
+
+    students = pd.Index(tables['students']['student_id'].to_numpy())
+    positions = students.get_indexer(tables['assignments']['student_id'].to_numpy())
+    order = np.argsort(positions, kind='stable')
+    if (order != np.arange(len(order))).any():
+        assignments = tables['assignments']
+        tables['assignments'] = (assignments.iloc[order].reset_index(drop=True)
+                                 if isinstance(assignments, pd.DataFrame) else assignments.take(order))
+    # Assignments of students missing from the students table sort first and fall before offset 0
+    tables['assignment_offsets'] = np.searchsorted(positions[order], np.arange(len(students) + 1))
+    return tables
+
+# Function to get the normalized records of students [start, stop) as DataFrames: the students in the range and the
+# assignments of those students, plus the whole courses and professors tables with the first range only. Professors
+# belong to courses rather than students, so a student range does not select any of them
+def slice_normalized(tables, start, stop):
+    students = slice_records(tables['students'], start, stop)
+    offsets = tables['assignment_offsets']
+    first, last = (int(offsets[min(position, len(offsets) - 1)]) for position in (start, stop))
+    assignments = slice_records(tables['assignments'], first, last)
+
+    return {
+        'courses': slice_records(tables['courses'], 0, 0 if start else count_records(tables['courses'])),
+        'students': students,
+        'professors': slice_records(tables['professors'], 0, 0 if start else count_records(tables['professors'])),
+        'assignments': assignments
+    }
+
+# Function to split denormalized records into the normalized tables, keeping the first row of each key
+def split_records(df):
+    return {table: df[columns].drop_duplicates(subset=columns[0]) for table, columns in NORMALIZED_TABLES.items()}
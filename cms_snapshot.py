@@ -0,0 +1,100 @@
+import glob
+import hashlib
+import os
+import socket
+import subprocess
+import time
+
+# Snapshot cache of the loaded databases. A snapshot is a tarball of an engine's docker volume (see
+# docker-compose.yml) taken right after ingest, keyed by the dataset content hash, the record count and the schema
+# variant, so a rerun with nothing changed upstream restores it instead of re-ingesting
+
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_IMAGE = 'busybox'
+STARTUP_TIMEOUT = 180
+
+# Container, data directory, client port and the command run in the container before a save, so everything loaded
+# is on disk: Redis writes its RDB dump (loaded again on startup) and Cassandra flushes its memtables
+ENGINES = {
+    'mysql': ('mysql_cms', '/var/lib/mysql', 3306, None),
+    'mongodb': ('mongodb_cms', '/data/db', 27017, None),
+    'neo4j': ('neo4j_cms', '/data', 7687, None),
+    'redis': ('redis_cms', '/data', 6379, ["redis-cli", "save"]),
+    'cassandra': ('cassandra_cms', '/var/lib/cassandra', 9042, ["nodetool", "flush"])
+}
+
+# Content hashes of the datasets already hashed in this run
+dataset_hashes = {}
+
+# Function to hash the content of a dataset: a path, a glob over part files or a normalized '{table}' pattern
+def dataset_hash(pattern):
+    if pattern not in dataset_hashes:
+        paths = sorted(glob.glob(pattern.replace('{table}', '*'))) or [pattern]
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        dataset_hashes[pattern] = digest.hexdigest()
+    return dataset_hashes[pattern]
+
+# Function to build the snapshot key of a dataset, a record count and the settings that change what is loaded
+def snapshot_key(dataset, size, *variant):
+    return "-".join([dataset_hash(dataset)[:16], str(size), *map(str, variant)])
+
+# Function to get the tarball of an engine's snapshot
+def snapshot_path(engine, key):
+    return os.path.join(SNAPSHOT_DIR, f"{engine}-{key}.tar")
+
+# Function to run a shell command over the stopped container's volumes, then start the container again
+def run_on_volume(container, command):
+    subprocess.run(["docker", "stop", container], check=True)
+    try:
+        subprocess.run([
+            "docker", "run", "--rm", "--volumes-from", container,
+            "-v", f"{os.path.abspath(SNAPSHOT_DIR)}:/snapshots", SNAPSHOT_IMAGE, "sh", "-c", command
+        ], check=True)
+    finally:
+        subprocess.run(["docker", "start", container], check=True)
+
+# Function to wait until the engine accepts connections again after a restart
+def wait_for_port(host, port):
+    deadline = time.time() + STARTUP_TIMEOUT
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(1)
+
+# Function to save the engine's volume as the snapshot `key`
+def save_snapshot(engine, key, host):
+    container, data_dir, port, flush_command = ENGINES[engine]
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    name = os.path.basename(snapshot_path(engine, key))
+    if flush_command:
+        subprocess.run(["docker", "exec", container, *flush_command], check=True)
+
+    # Writing to a temporary name first, so an interrupted save never looks like a snapshot
+    run_on_volume(container, f"tar -C {data_dir} -cf /snapshots/{name}.tmp . && mv /snapshots/{name}.tmp /snapshots/{name}")
+    wait_for_port(host, port)
+    print(f"Snapshot saved: {snapshot_path(engine, key)}")
+
+# Function to restore the snapshot `key` into the engine's volume. Returns the restore time in seconds, or None
+# when there is no such snapshot and the data has to be ingested
+def restore_snapshot(engine, key, host):
+    if not os.path.exists(snapshot_path(engine, key)):
+        return None
+
+    container, data_dir, port, _ = ENGINES[engine]
+    name = os.path.basename(snapshot_path(engine, key))
+    start_time = time.time()
+    run_on_volume(container, f"find {data_dir} -mindepth 1 -delete && tar -C {data_dir} -xf /snapshots/{name}")
+    wait_for_port(host, port)
+    restore_time = time.time() - start_time
+
+    print(f"Snapshot restored in {restore_time:.2f} s: {snapshot_path(engine, key)}")
+    return restore_time
\ No newline at end of file
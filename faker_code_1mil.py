@@ -1,21 +1,94 @@
 from faker import Faker
+from multiprocessing import Pool
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import random
 import csv
+import os
+import shutil
 
-fake = Faker()
-
-# Number of records
+# Number of students; every student contributes one record per assignment
 num_records = 1_000_000
 
 # File output path
 combined_file = '1_mil_records.csv'
 
-def generate_unique_ids(count, start=100000):
+# Sharded generation: number of shards, base seed and whether the part files are merged into `combined_file`. The
+# output depends on the seed and the shard count, so the default shard count is fixed and every host generates the
+# same dataset; set num_shards = os.cpu_count() to opt into one shard per CPU instead. The shards run on up to
+# num_workers processes, which does not change the output
+num_shards = 8
+num_workers = min(num_shards, os.cpu_count() or 1)
+seed = 42
+merge_shards = True
+
+# Generation engine: "vectorized" (NumPy arrays and precomputed name pools) or "faker" (one Faker call per name)
+engine = "vectorized"
+block_size = 100_000
+
+# Output format: "csv", "parquet" or "arrow" (an Arrow IPC file the loaders can memory-map)
+output_format = "csv"
+output_extensions = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Export mode: "denormalized" (one combined file) or "normalized" (one file per table, e.g. 1_mil_records_students.csv)
+export_mode = "denormalized"
+normalized_tables = {
+    'courses': ['course_id', 'course_name', 'course_content'],
+    'students': ['student_id', 'student_name', 'student_email_address', 'course_id'],
+    'professors': ['professor_id', 'professor_name', 'professor_email_address', 'course_id'],
+    'assignments': ['assignment_id', 'assignment_title', 'submission_status', 'score', 'student_id', 'course_id']
+}
+
+# Cardinality and skew model:
+# - every student gets between assignments_per_student[0] and [1] assignments (inclusive), each with its own id
+# - every course has professors_per_course professors (None keeps roughly num_records // 10 professors overall)
+# - courses are picked "uniform"ly or following a "zipf" power law with zipf_exponent, ranked from Data Analysis,
+#   the course every benchmark query targets, down the course list
+assignments_per_student = (1, 1)
+professors_per_course = None
+course_distribution = "uniform"
+zipf_exponent = 1.1
+
+# Ids used by the fixed records; generated ids skip them so every key stays unique
+fixed_student_ids = [533994, 540214]
+fixed_professor_ids = [676734]
+fixed_assignment_ids = [1100000, 1100001]
+
+# Header of the combined CSV file read by every loader
+csv_header = [
+    'course_id', 'course_name', 'course_content',
+    'student_id', 'student_name', 'student_email_address',
+    'professor_id', 'professor_name', 'professor_email_address',
+    'assignment_id', 'assignment_title', 'submission_status', 'score'
+]
+
+# List of all course names
+course_names = [
+    "Artificial Intelligence & Robotics", "Mechanical Engineering", "Aerospace Engineering",
+    "Supply Chain Management & Logistics", "International Business", "Master of Business Administration (MBA)",
+    "IT Management", "Human Resource Management", "Architecture", "Interior Design", 
+    "Cybersecurity & Forensic Science", "Emergency & Disaster Management", "Computer Science", 
+    "Information Technology", "Artificial Intelligence & Machine Learning", "Data Analysis",
+    "Cyber Security", "Cloud Computing", "Hospitality Management", "Tourism & Leisure", 
+    "Psychology", "Medicine", "Political Science and International Relations", "Nursing", 
+    "International Law", "Criminal Justice", "Economics", "Forensic Psychology", 
+    "Archaeology", "Sociology"
+]
+
+def generate_unique_ids(count, start=100000, rng=random):
     # Ensure that the range is large enough for the required count
     range_end = start + count
     if range_end > start + count:
         raise ValueError("The count exceeds the possible range.")
-    return random.sample(range(start, range_end), count)
+    return rng.sample(range(start, range_end), count)
+
+# Shift generated ids past the fixed ids, keeping them unique and in the same order. Works on ints and arrays
+def skip_fixed_ids(ids, fixed_ids):
+    for fixed_id in sorted(fixed_ids):
+        ids = ids + (ids >= fixed_id)
+    return ids
 
 # Generate email address based on name
 def generate_email(name):
@@ -23,215 +96,556 @@ def generate_email(name):
     return f"{formatted_name}@gmail.com"
 
 # List of course names and their corresponding 10 assignment titles
+assignment_titles = {
+    "Artificial Intelligence & Robotics": [
+        "Introduction to AI", "Machine Learning Basics", "Robotics and Control", "Neural Networks in AI", 
+        "Deep Learning Models", "AI in Healthcare", "AI and Ethics", "AI Algorithms", 
+        "Robotics in Manufacturing", "Future of Robotics"
+    ],
+    "Mechanical Engineering": [
+        "Strength of Materials", "Thermodynamics Principles", "Fluid Mechanics", "Material Science",
+        "Mechanical Vibrations", "Thermal Engineering", "Mechanisms and Machines", "Engineering Drawing",
+        "Mechanical Design", "Manufacturing Processes"
+    ],
+    "Aerospace Engineering": [
+        "Aerodynamics", "Space Exploration", "Flight Mechanics", "Aircraft Structures", 
+        "Control Systems", "Spacecraft Design", "Rocket Propulsion", "Avionics Systems", 
+        "Navigation and Guidance", "Aerospace Materials"
+    ],
+    "Supply Chain Management & Logistics": [
+        "Logistics and Distribution", "Inventory Management", "Supply Chain Optimization", "Global Logistics", 
+        "Transportation Management", "Warehousing", "Demand Planning", "Supplier Relationship Management", 
+        "Risk Management", "Supply Chain Technologies"
+    ],
+    "International Business": [
+        "Global Market Analysis", "Cross-cultural Management", "International Trade", "International Finance",
+        "Global Business Strategy", "Emerging Markets", "Global Entrepreneurship", "Multinational Management",
+        "Global Marketing", "International Negotiation"
+    ],
+    "Master of Business Administration (MBA)": [
+        "Business Strategy", "Financial Management", "Marketing Principles", "Operations Management",
+        "Human Resource Management", "Entrepreneurship", "Business Ethics", "Leadership Skills",
+        "Global Business", "Strategic Management"
+    ],
+    "IT Management": [
+        "IT Strategy", "Cybersecurity Management", "Information Systems", "Business Intelligence",
+        "Enterprise Resource Planning", "Cloud Computing", "Data Governance", "Project Management",
+        "Technology Innovation", "IT Operations"
+    ],
+    "Human Resource Management": [
+        "Recruitment and Selection", "Employee Relations", "Labor Laws", "Training and Development",
+        "Performance Management", "Organizational Behavior", "Workplace Diversity", "Compensation and Benefits",
+        "HR Analytics", "Strategic HRM"
+    ],
+    "Architecture": [
+        "Architectural Design", "Building Systems", "Construction Management", "Urban Design", 
+        "Sustainability in Architecture", "Architectural Theory", "Materials and Construction", 
+        "Structural Design", "Interior Architecture", "Digital Fabrication"
+    ],
+    "Interior Design": [
+        "Design Principles", "Furniture Design", "Space Planning", "Lighting Design", "Sustainable Design",
+        "Computer-Aided Design", "Residential Interiors", "Commercial Interiors", "Architectural Detailing",
+        "Design Psychology"
+    ],
+    "Cybersecurity & Forensic Science": [
+        "Network Security", "Cryptography", "Digital Forensics", "Incident Response", "Cybercrime Investigation",
+        "Cyber Law", "Risk Management", "Ethical Hacking", "Malware Analysis", "Cybersecurity Technologies"
+    ],
+    "Emergency & Disaster Management": [
+        "Disaster Preparedness", "Crisis Management", "Risk Assessment", "Public Health Emergency",
+        "Incident Command Systems", "Search and Rescue", "Emergency Response Coordination", 
+        "Disaster Recovery", "Community Resilience", "Humanitarian Assistance"
+    ],
+    "Computer Science": [
+        "Data Structures", "Algorithms", "Operating Systems", "Software Engineering", 
+        "Database Systems", "Computer Networks", "Web Development", "Machine Learning", 
+        "Artificial Intelligence", "Mobile Application Development"
+    ],
+    "Information Technology": [
+        "Networking Fundamentals", "Web Technologies", "Database Management", "System Analysis", 
+        "Project Management", "Security in IT", "Cloud Computing", "Data Warehousing", 
+        "E-Commerce", "Software Development"
+    ],
+    "Artificial Intelligence & Machine Learning": [
+        "Introduction to Machine Learning", "Supervised Learning", "Unsupervised Learning", 
+        "Neural Networks", "Deep Learning", "Reinforcement Learning", "Natural Language Processing", 
+        "Computer Vision", "AI Applications", "AI Ethics"
+    ],
+    "Data Analysis": [
+        "Statistical Analysis", "Regression Analysis", "Data Cleaning", "Exploratory Data Analysis", 
+        "Data Visualization", "Machine Learning in Data Analysis", "Big Data", "Time Series Analysis",
+        "Predictive Modeling", "Data Analysis with Python"
+    ],
+    "Cyber Security": [
+        "Network Security", "Security Protocols", "Cryptography", "Risk Management", 
+        "Ethical Hacking", "Security Operations", "Malware Analysis", "Penetration Testing", 
+        "Security Policy", "Cyber Threat Intelligence"
+    ],
+    "Cloud Computing": [
+        "Cloud Architecture", "Virtualization", "Cloud Security", "Cloud Services", 
+        "Distributed Systems", "Cloud Storage", "Cloud-based Applications", "Cloud Computing Platforms",
+        "Data Center Management", "Cloud Computing Security"
+    ],
+    "Hospitality Management": [
+        "Hotel Management", "Food and Beverage Management", "Event Planning", "Hospitality Marketing",
+        "Tourism Management", "Guest Services", "Hospitality Operations", "Sustainable Tourism", 
+        "Hospitality Law", "Leadership in Hospitality"
+    ],
+    "Tourism & Leisure": [
+        "Tourism Planning", "Tourism Economics", "Cultural Heritage", "Tourism Marketing", 
+        "Tourism Destination Management", "Sustainable Tourism", "Tourism Policy", "Leisure Management",
+        "Event Planning", "Tourism Research"
+    ],
+    "Psychology": [
+        "Introduction to Psychology", "Behavioral Psychology", "Cognitive Psychology", "Developmental Psychology",
+        "Clinical Psychology", "Psychological Testing", "Neuropsychology", "Social Psychology",
+        "Psychopathology", "Psychotherapy"
+    ],
+    "Medicine": [
+        "Anatomy and Physiology", "Medical Ethics", "Pathology", "Pharmacology", 
+        "Clinical Skills", "Public Health", "Medical Microbiology", "Immunology", 
+        "Medical Research", "Medical Imaging"
+    ],
+    "Political Science and International Relations": [
+        "International Relations Theory", "Political Systems", "Comparative Politics", "Public Policy", 
+        "Global Governance", "International Law", "Political Economy", "Conflict Resolution", 
+        "International Organizations", "Foreign Policy Analysis"
+    ],
+    "Nursing": [
+        "Nursing Fundamentals", "Clinical Nursing", "Healthcare Ethics", "Nursing Research", 
+        "Pharmacology for Nurses", "Pediatric Nursing", "Adult Nursing", "Psychiatric Nursing", 
+        "Community Health Nursing", "Geriatric Nursing"
+    ],
+    "International Law": [
+        "International Legal Systems", "Human Rights Law", "International Trade Law", 
+        "International Humanitarian Law", "Dispute Resolution", "International Criminal Law",
+        "Diplomacy and Law", "International Arbitration", "Sovereignty", "International Environmental Law"
+    ],
+    "Criminal Justice": [
+        "Criminal Law", "Criminal Procedure", "Forensic Science", "Crime and Society", 
+        "Policing", "Corrections", "Criminal Investigations", "Juvenile Justice", 
+        "Ethics in Criminal Justice", "Victimology"
+    ],
+    "Economics": [
+        "Microeconomics", "Macroeconomics", "International Economics", "Development Economics", 
+        "Economic Theory", "Public Finance", "Labor Economics", "Environmental Economics", 
+        "Behavioral Economics", "Econometrics"
+    ],
+    "Forensic Psychology": [
+        "Criminal Behavior", "Psychological Assessment", "Mental Health Law", "Psychopathology", 
+        "Criminal Profiling", "Jury Decision Making", "Psychological Testing", "Forensic Interviewing", 
+        "Risk Assessment", "Violent Crime"
+    ],
+    "Archaeology": [
+        "Prehistoric Archaeology", "Historical Archaeology", "Field Methods", "Ethnoarchaeology", 
+        "Archaeological Theory", "Cultural Resource Management", "Archaeological Excavation", 
+        "Ancient Civilizations", "Material Culture", "Archaeological Science"
+    ],
+    "Sociology": [
+        "Introduction to Sociology", "Social Theory", "Social Problems", "Cultural Sociology", 
+        "Sociological Research", "Gender Studies", "Sociology of Education", "Race and Ethnicity",
+        "Urban Sociology", "Criminology"
+    ]
+}
+
+# Course content for each course name
+course_contents = {
+    "Artificial Intelligence & Robotics": "Principles of AI, robotics, machine learning, and their applications.",
+    "Mechanical Engineering": "Design and analysis of mechanical systems, thermodynamics, and materials science.",
+    "Aerospace Engineering": "Study of aerodynamics, spacecraft design, propulsion systems, and flight mechanics.",
+    "Supply Chain Management & Logistics": "Methods for optimizing supply chains, logistics, and distribution systems.",
+    "International Business": "Study of global business, international markets, and strategies for operating worldwide.",
+    "Master of Business Administration (MBA)": "An integrated study of management principles for aspiring business leaders.",
+    "IT Management": "Managing IT infrastructure, strategies, and systems in organizations.",
+    "Human Resource Management": "Focus on recruitment, employee management, and organizational behavior.",
+    "Architecture": "Study of building design, structural engineering, and sustainable architecture.",
+    "Interior Design": "Designing functional and aesthetic interiors for residential and commercial spaces.",
+    "Cybersecurity & Forensic Science": "Study of digital forensics, network security, and crime scene investigation techniques.",
+    "Emergency & Disaster Management": "Planning and coordination for disaster prevention, response, and recovery.",
+    "Computer Science": "Fundamentals of programming, algorithms, data structures, and computer architecture.",
+    "Information Technology": "Application and management of IT systems, networks, and security.",
+    "Artificial Intelligence & Machine Learning": "Foundations and advanced concepts in AI, machine learning, and neural networks.",
+    "Data Analysis": "Techniques for analyzing and interpreting data to uncover trends and insights.",
+    "Cyber Security": "Study of security technologies, ethical hacking, and techniques to protect against cyber threats.",
+    "Cloud Computing": "Exploring the architecture, services, and deployment models of cloud computing.",
+    "Hospitality Management": "Operations, marketing, and management of the hospitality industry.",
+    "Tourism & Leisure": "Study of tourism systems, leisure management, and the business of travel.",
+    "Psychology": "The study of human behavior, cognition, emotions, and mental health.",
+    "Medicine": "Healthcare practices, patient care, and clinical applications in medicine.",
+    "Political Science and International Relations": "Study of political systems, international organizations, and governance.",
+    "Nursing": "Study of patient care, nursing practices, and the healthcare system.",
+    "International Law": "Global legal systems, human rights, and international trade law.",
+    "Criminal Justice": "Study of crime, law enforcement, legal systems, and the criminal justice process.",
+    "Economics": "Theory and practice of economics, market behaviors, and economic policies.",
+    "Forensic Psychology": "Psychological aspects of criminal behavior, profiling, and legal proceedings.",
+    "Archaeology": "Exploring ancient cultures through material evidence and archaeological methods.",
+    "Sociology": "Examination of social behavior, groups, and societal issues."
+}
+
+# Look up the assignment titles of a course
 def generate_assignment_titles(course_name):
-    titles = {
-        "Artificial Intelligence & Robotics": [
-            "Introduction to AI", "Machine Learning Basics", "Robotics and Control", "Neural Networks in AI", 
-            "Deep Learning Models", "AI in Healthcare", "AI and Ethics", "AI Algorithms", 
-            "Robotics in Manufacturing", "Future of Robotics"
-        ],
-        "Mechanical Engineering": [
-            "Strength of Materials", "Thermodynamics Principles", "Fluid Mechanics", "Material Science",
-            "Mechanical Vibrations", "Thermal Engineering", "Mechanisms and Machines", "Engineering Drawing",
-            "Mechanical Design", "Manufacturing Processes"
-        ],
-        "Aerospace Engineering": [
-            "Aerodynamics", "Space Exploration", "Flight Mechanics", "Aircraft Structures", 
-            "Control Systems", "Spacecraft Design", "Rocket Propulsion", "Avionics Systems", 
-            "Navigation and Guidance", "Aerospace Materials"
-        ],
-        "Supply Chain Management & Logistics": [
-            "Logistics and Distribution", "Inventory Management", "Supply Chain Optimization", "Global Logistics", 
-            "Transportation Management", "Warehousing", "Demand Planning", "Supplier Relationship Management", 
-            "Risk Management", "Supply Chain Technologies"
-        ],
-        "International Business": [
-            "Global Market Analysis", "Cross-cultural Management", "International Trade", "International Finance",
-            "Global Business Strategy", "Emerging Markets", "Global Entrepreneurship", "Multinational Management",
-            "Global Marketing", "International Negotiation"
-        ],
-        "Master of Business Administration (MBA)": [
-            "Business Strategy", "Financial Management", "Marketing Principles", "Operations Management",
-            "Human Resource Management", "Entrepreneurship", "Business Ethics", "Leadership Skills",
-            "Global Business", "Strategic Management"
-        ],
-        "IT Management": [
-            "IT Strategy", "Cybersecurity Management", "Information Systems", "Business Intelligence",
-            "Enterprise Resource Planning", "Cloud Computing", "Data Governance", "Project Management",
-            "Technology Innovation", "IT Operations"
-        ],
-        "Human Resource Management": [
-            "Recruitment and Selection", "Employee Relations", "Labor Laws", "Training and Development",
-            "Performance Management", "Organizational Behavior", "Workplace Diversity", "Compensation and Benefits",
-            "HR Analytics", "Strategic HRM"
-        ],
-        "Architecture": [
-            "Architectural Design", "Building Systems", "Construction Management", "Urban Design", 
-            "Sustainability in Architecture", "Architectural Theory", "Materials and Construction", 
-            "Structural Design", "Interior Architecture", "Digital Fabrication"
-        ],
-        "Interior Design": [
-            "Design Principles", "Furniture Design", "Space Planning", "Lighting Design", "Sustainable Design",
-            "Computer-Aided Design", "Residential Interiors", "Commercial Interiors", "Architectural Detailing",
-            "Design Psychology"
-        ],
-        "Cybersecurity & Forensic Science": [
-            "Network Security", "Cryptography", "Digital Forensics", "Incident Response", "Cybercrime Investigation",
-            "Cyber Law", "Risk Management", "Ethical Hacking", "Malware Analysis", "Cybersecurity Technologies"
-        ],
-        "Emergency & Disaster Management": [
-            "Disaster Preparedness", "Crisis Management", "Risk Assessment", "Public Health Emergency",
-            "Incident Command Systems", "Search and Rescue", "Emergency Response Coordination", 
-            "Disaster Recovery", "Community Resilience", "Humanitarian Assistance"
-        ],
-        "Computer Science": [
-            "Data Structures", "Algorithms", "Operating Systems", "Software Engineering", 
-            "Database Systems", "Computer Networks", "Web Development", "Machine Learning", 
-            "Artificial Intelligence", "Mobile Application Development"
-        ],
-        "Information Technology": [
-            "Networking Fundamentals", "Web Technologies", "Database Management", "System Analysis", 
-            "Project Management", "Security in IT", "Cloud Computing", "Data Warehousing", 
-            "E-Commerce", "Software Development"
-        ],
-        "Artificial Intelligence & Machine Learning": [
-            "Introduction to Machine Learning", "Supervised Learning", "Unsupervised Learning", 
-            "Neural Networks", "Deep Learning", "Reinforcement Learning", "Natural Language Processing", 
-            "Computer Vision", "AI Applications", "AI Ethics"
-        ],
-        "Data Analysis": [
-            "Statistical Analysis", "Regression Analysis", "Data Cleaning", "Exploratory Data Analysis", 
-            "Data Visualization", "Machine Learning in Data Analysis", "Big Data", "Time Series Analysis",
-            "Predictive Modeling", "Data Analysis with Python"
-        ],
-        "Cyber Security": [
-            "Network Security", "Security Protocols", "Cryptography", "Risk Management", 
-            "Ethical Hacking", "Security Operations", "Malware Analysis", "Penetration Testing", 
-            "Security Policy", "Cyber Threat Intelligence"
-        ],
-        "Cloud Computing": [
-            "Cloud Architecture", "Virtualization", "Cloud Security", "Cloud Services", 
-            "Distributed Systems", "Cloud Storage", "Cloud-based Applications", "Cloud Computing Platforms",
-            "Data Center Management", "Cloud Computing Security"
-        ],
-        "Hospitality Management": [
-            "Hotel Management", "Food and Beverage Management", "Event Planning", "Hospitality Marketing",
-            "Tourism Management", "Guest Services", "Hospitality Operations", "Sustainable Tourism", 
-            "Hospitality Law", "Leadership in Hospitality"
-        ],
-        "Tourism & Leisure": [
-            "Tourism Planning", "Tourism Economics", "Cultural Heritage", "Tourism Marketing", 
-            "Tourism Destination Management", "Sustainable Tourism", "Tourism Policy", "Leisure Management",
-            "Event Planning", "Tourism Research"
-        ],
-        "Psychology": [
-            "Introduction to Psychology", "Behavioral Psychology", "Cognitive Psychology", "Developmental Psychology",
-            "Clinical Psychology", "Psychological Testing", "Neuropsychology", "Social Psychology",
-            "Psychopathology", "Psychotherapy"
-        ],
-        "Medicine": [
-            "Anatomy and Physiology", "Medical Ethics", "Pathology", "Pharmacology", 
-            "Clinical Skills", "Public Health", "Medical Microbiology", "Immunology", 
-            "Medical Research", "Medical Imaging"
-        ],
-        "Political Science and International Relations": [
-            "International Relations Theory", "Political Systems", "Comparative Politics", "Public Policy", 
-            "Global Governance", "International Law", "Political Economy", "Conflict Resolution", 
-            "International Organizations", "Foreign Policy Analysis"
-        ],
-        "Nursing": [
-            "Nursing Fundamentals", "Clinical Nursing", "Healthcare Ethics", "Nursing Research", 
-            "Pharmacology for Nurses", "Pediatric Nursing", "Adult Nursing", "Psychiatric Nursing", 
-            "Community Health Nursing", "Geriatric Nursing"
-        ],
-        "International Law": [
-            "International Legal Systems", "Human Rights Law", "International Trade Law", 
-            "International Humanitarian Law", "Dispute Resolution", "International Criminal Law",
-            "Diplomacy and Law", "International Arbitration", "Sovereignty", "International Environmental Law"
-        ],
-        "Criminal Justice": [
-            "Criminal Law", "Criminal Procedure", "Forensic Science", "Crime and Society", 
-            "Policing", "Corrections", "Criminal Investigations", "Juvenile Justice", 
-            "Ethics in Criminal Justice", "Victimology"
-        ],
-        "Economics": [
-            "Microeconomics", "Macroeconomics", "International Economics", "Development Economics", 
-            "Economic Theory", "Public Finance", "Labor Economics", "Environmental Economics", 
-            "Behavioral Economics", "Econometrics"
-        ],
-        "Forensic Psychology": [
-            "Criminal Behavior", "Psychological Assessment", "Mental Health Law", "Psychopathology", 
-            "Criminal Profiling", "Jury Decision Making", "Psychological Testing", "Forensic Interviewing", 
-            "Risk Assessment", "Violent Crime"
-        ],
-        "Archaeology": [
-            "Prehistoric Archaeology", "Historical Archaeology", "Field Methods", "Ethnoarchaeology", 
-            "Archaeological Theory", "Cultural Resource Management", "Archaeological Excavation", 
-            "Ancient Civilizations", "Material Culture", "Archaeological Science"
-        ],
-        "Sociology": [
-            "Introduction to Sociology", "Social Theory", "Social Problems", "Cultural Sociology", 
-            "Sociological Research", "Gender Studies", "Sociology of Education", "Race and Ethnicity",
-            "Urban Sociology", "Criminology"
-        ]
-    }
-    
-    return titles.get(course_name, [])
+    return assignment_titles.get(course_name, [])
 
 # Generate course content based on course name
 def generate_course_content(course_name):
-    content = {
-        "Artificial Intelligence & Robotics": "Principles of AI, robotics, machine learning, and their applications.",
-        "Mechanical Engineering": "Design and analysis of mechanical systems, thermodynamics, and materials science.",
-        "Aerospace Engineering": "Study of aerodynamics, spacecraft design, propulsion systems, and flight mechanics.",
-        "Supply Chain Management & Logistics": "Methods for optimizing supply chains, logistics, and distribution systems.",
-        "International Business": "Study of global business, international markets, and strategies for operating worldwide.",
-        "Master of Business Administration (MBA)": "An integrated study of management principles for aspiring business leaders.",
-        "IT Management": "Managing IT infrastructure, strategies, and systems in organizations.",
-        "Human Resource Management": "Focus on recruitment, employee management, and organizational behavior.",
-        "Architecture": "Study of building design, structural engineering, and sustainable architecture.",
-        "Interior Design": "Designing functional and aesthetic interiors for residential and commercial spaces.",
-        "Cybersecurity & Forensic Science": "Study of digital forensics, network security, and crime scene investigation techniques.",
-        "Emergency & Disaster Management": "Planning and coordination for disaster prevention, response, and recovery.",
-        "Computer Science": "Fundamentals of programming, algorithms, data structures, and computer architecture.",
-        "Information Technology": "Application and management of IT systems, networks, and security.",
-        "Artificial Intelligence & Machine Learning": "Foundations and advanced concepts in AI, machine learning, and neural networks.",
-        "Data Analysis": "Techniques for analyzing and interpreting data to uncover trends and insights.",
-        "Cyber Security": "Study of security technologies, ethical hacking, and techniques to protect against cyber threats.",
-        "Cloud Computing": "Exploring the architecture, services, and deployment models of cloud computing.",
-        "Hospitality Management": "Operations, marketing, and management of the hospitality industry.",
-        "Tourism & Leisure": "Study of tourism systems, leisure management, and the business of travel.",
-        "Psychology": "The study of human behavior, cognition, emotions, and mental health.",
-        "Medicine": "Healthcare practices, patient care, and clinical applications in medicine.",
-        "Political Science and International Relations": "Study of political systems, international organizations, and governance.",
-        "Nursing": "Study of patient care, nursing practices, and the healthcare system.",
-        "International Law": "Global legal systems, human rights, and international trade law.",
-        "Criminal Justice": "Study of crime, law enforcement, legal systems, and the criminal justice process.",
-        "Economics": "Theory and practice of economics, market behaviors, and economic policies.",
-        "Forensic Psychology": "Psychological aspects of criminal behavior, profiling, and legal proceedings.",
-        "Archaeology": "Exploring ancient cultures through material evidence and archaeological methods.",
-        "Sociology": "Examination of social behavior, groups, and societal issues."
+    return course_contents.get(course_name, "Content not available for this course.")
+
+# Split the record range into contiguous (start, stop) ranges, one per shard
+def shard_ranges(count, shards):
+    step, remainder = divmod(count, shards)
+    ranges = []
+    start = 0
+    for shard in range(shards):
+        stop = start + step + (1 if shard < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+# Path of an output file of the configured format, e.g. the part file of a shard
+def output_path(suffix=""):
+    base = os.path.splitext(combined_file)[0]
+    return f"{base}{suffix}{output_extensions[output_format]}"
+
+# Path of the combined file of a normalized table
+def table_path(table=None):
+    return output_path(f"_{table}" if table else "")
+
+# Path of the part file written by a shard
+def shard_path(shard, table=None):
+    return output_path(f"_{table}.part{shard:03d}" if table else f".part{shard:03d}")
+
+# Fixed vocabularies of the low-cardinality columns, stored dictionary-encoded in Parquet/Arrow output
+def arrow_dictionaries():
+    titles = {title for course_titles in assignment_titles.values() for title in course_titles}
+    titles.add("Database: Course Management System")
+    return {
+        'course_name': pa.array(course_names),
+        'course_content': pa.array([generate_course_content(name) for name in course_names]),
+        'assignment_title': pa.array(sorted(titles)),
+        'submission_status': pa.array(['Yes', 'No'])
     }
-    return content.get(course_name, "Content not available for this course.")
 
-def generate_all_data():
-    student_ids = generate_unique_ids(num_records)
-    professor_ids = generate_unique_ids(num_records // 10)
-    assignment_ids = generate_unique_ids(num_records // 10)
-    
-    # List of all course names
-    course_names = [
-        "Artificial Intelligence & Robotics", "Mechanical Engineering", "Aerospace Engineering",
-        "Supply Chain Management & Logistics", "International Business", "Master of Business Administration (MBA)",
-        "IT Management", "Human Resource Management", "Architecture", "Interior Design", 
-        "Cybersecurity & Forensic Science", "Emergency & Disaster Management", "Computer Science", 
-        "Information Technology", "Artificial Intelligence & Machine Learning", "Data Analysis",
-        "Cyber Security", "Cloud Computing", "Hospitality Management", "Tourism & Leisure", 
-        "Psychology", "Medicine", "Political Science and International Relations", "Nursing", 
-        "International Law", "Criminal Justice", "Economics", "Forensic Psychology", 
-        "Archaeology", "Sociology"
-    ]
+# Arrow schema of a table: ids and scores as int64, fixed vocabularies as dictionaries, everything else as strings
+def arrow_schema(columns):
+    dictionaries = arrow_dictionaries()
+    fields = []
+    for column in columns:
+        if column in dictionaries:
+            fields.append(pa.field(column, pa.dictionary(pa.int16(), pa.string())))
+        elif column.endswith('_id') or column == 'score':
+            fields.append(pa.field(column, pa.int64()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+# Writer for blocks of columns in the configured output format
+class BlockWriter:
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = columns
+        if output_format == "csv":
+            self.file = open(path, 'w', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(columns)
+            return
+
+        self.schema = arrow_schema(columns)
+        self.dictionaries = arrow_dictionaries()
+        if output_format == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    # Function to write a block given as a dict of column name to values
+    def write(self, block):
+        if output_format == "csv":
+            self.writer.writerows(zip(*(block[column] for column in self.columns)))
+            return
+
+        arrays = []
+        for field in self.schema:
+            if field.name in self.dictionaries:
+                # Every batch shares the same dictionary so the IPC file never needs a dictionary replacement
+                values = pa.array(list(block[field.name]), type=pa.string())
+                indices = pc.index_in(values, value_set=self.dictionaries[field.name]).cast(pa.int16())
+                values = pa.DictionaryArray.from_arrays(indices, self.dictionaries[field.name])
+            else:
+                values = pa.array(list(block[field.name]), type=field.type)
+            arrays.append(values)
+        self.write_batch(pa.record_batch(arrays, schema=self.schema))
+
+    def write_batch(self, batch):
+        if output_format == "parquet":
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+
+    def close(self):
+        if output_format == "csv":
+            self.file.close()
+        else:
+            self.writer.close()
+
+# Number of professors teaching each course
+def professors_per_course_count():
+    return professors_per_course or max(1, num_records // 10 // len(course_names))
+
+# Probability of each course being picked by a student
+def course_weights():
+    if course_distribution == "zipf":
+        ranking = [course_names.index("Data Analysis")] + [i for i, name in enumerate(course_names) if name != "Data Analysis"]
+        weights = np.empty(len(course_names))
+        weights[ranking] = 1.0 / np.arange(1, len(course_names) + 1) ** zipf_exponent
+    else:
+        weights = np.ones(len(course_names))
+    return weights / weights.sum()
+
+# Ids of the generated professors: professor rank r teaches course r // professors_per_course_count()
+def professor_id_for_rank(rank):
+    return skip_fixed_ids(100000 + rank, fixed_professor_ids)
+
+# Ids of the generated assignments: assignment j of the student at position i, so they never collide
+def assignment_id_for(position, number):
+    return skip_fixed_ids(100000 + position * assignments_per_student[1] + number, fixed_assignment_ids)
+
+# Function to generate the records of students [start, stop) into the shard's own part files
+def generate_shard(shard, start, stop):
+    professor_start, professor_stop = shard_ranges(len(course_names) * professors_per_course_count(), num_shards)[shard]
+    if engine == "vectorized":
+        blocks = generate_blocks_vectorized(shard, start, stop)
+        professor_blocks = generate_professors_vectorized(professor_start, professor_stop)
+    else:
+        blocks = generate_blocks_faker(shard, start, stop)
+        professor_blocks = generate_professors_faker(professor_start, professor_stop)
+
+    if export_mode == "normalized":
+        writers = {table: BlockWriter(shard_path(shard, table), columns) for table, columns in normalized_tables.items()}
+    else:
+        writers = {None: BlockWriter(shard_path(shard), csv_header)}
+
+    # The first shard starts with the specific records for Vidhya Harini and Nuthan Puli
+    if shard == 0:
+        write_block(writers, fixed_records_block(), fixed=True)
+
+    # Writing each block of columns at once
+    for block in blocks:
+        write_block(writers, block)
+
+    # In the normalized export every shard also writes its own range of the professors table
+    if export_mode == "normalized":
+        for block in professor_blocks:
+            writers['professors'].write(block)
+
+    paths = {}
+    for table, writer in writers.items():
+        writer.close()
+        paths[table] = writer.path
+
+    print(f"Shard {shard} generated students {start} to {stop}.")
+    return paths
+
+# Function to write a block of denormalized records in the configured export mode
+def write_block(writers, block, fixed=False):
+    if export_mode == "normalized":
+        for table, table_block in normalize_block(block, fixed).items():
+            writers[table].write(table_block)
+    else:
+        writers[None].write(block)
+
+# Function to split a block of denormalized records into the normalized tables. Every key is unique, so a student
+# is only repeated by its own consecutive records (one per assignment)
+def normalize_block(block, fixed=False):
+    columns = {column: np.asarray(values, dtype=object) for column, values in block.items()}
+    student_ids = columns['student_id'].astype(np.int64)
+    tables = {}
+
+    # All 30 courses are written once, by the first shard, ahead of the fixed records and Armando Ruggeri
+    if fixed:
+        tables['courses'] = {
+            'course_id': [100000 + index for index in range(len(course_names))],
+            'course_name': course_names,
+            'course_content': [generate_course_content(name) for name in course_names]
+        }
+        tables['professors'] = {column: columns[column][:1] for column in normalized_tables['professors']}
+
+    masks = {
+        'students': np.r_[True, student_ids[1:] != student_ids[:-1]],
+        'assignments': np.ones(len(student_ids), dtype=bool)
+    }
+    for table, mask in masks.items():
+        tables[table] = {column: columns[column][mask] for column in normalized_tables[table]}
+    return tables
+
+# Faker engine: every record is built in Python with its own Faker calls
+def generate_blocks_faker(shard, start, stop):
+    # Every shard has its own seeded generators so the output only depends on the seed and shard count
+    rng = random.Random(f"{seed}:{shard}")
+    shard_fake = Faker()
+    shard_fake.seed_instance(f"{seed}:{shard}")
+
+    # Student ids are drawn from the shard's own block of the id range so they stay unique across shards
+    student_ids = generate_unique_ids(stop - start, start=100000 + start, rng=rng)
+
+    course_indexes = range(len(course_names))
+    cumulative_weights = np.cumsum(course_weights()).tolist()
+    per_course = professors_per_course_count()
+    professor_fake = Faker()
+    professor_names = {}
 
+    for block_start in range(start, stop, block_size):
+        rows = []
+        for i in range(block_start, min(block_start + block_size, stop)):
+            student_id = skip_fixed_ids(student_ids[i - start], fixed_student_ids)
+            
+            # Randomly pick a course name and its content
+            course_index = rng.choices(course_indexes, cum_weights=cumulative_weights)[0]
+            course_name = course_names[course_index]
+            course_id = 100000 + course_index  # Assigning unique ID
+            course_content = generate_course_content(course_name)
+            
+            student_name = shard_fake.name()
+
+            # One of the course's professors, always with the same name
+            professor_id = professor_id_for_rank(course_index * per_course + rng.randrange(per_course))
+            if professor_id not in professor_names:
+                professor_names[professor_id] = professor_name_faker(professor_fake, professor_id)
+            professor_name = professor_names[professor_id]
+
+            # Handle assignments
+            titles = generate_assignment_titles(course_name)
+            for number in range(rng.randint(*assignments_per_student)):
+                assignment_title = rng.choice(titles)
+                assignment_id = assignment_id_for(i, number)
+                submission_status = rng.choice(['Yes', 'No'])
+                score = rng.randint(18, 30) if submission_status == "Yes" else 0
+
+                rows.append([ 
+                    course_id, course_name, course_content,
+                    student_id, student_name, generate_email(student_name),
+                    professor_id, professor_name, generate_email(professor_name),
+                    assignment_id, assignment_title, submission_status, score
+                ])
+        yield dict(zip(csv_header, zip(*rows)))
+
+# Name of a generated professor, reseeding `professor_fake` with the professor id so every shard agrees on it
+def professor_name_faker(professor_fake, professor_id):
+    professor_fake.seed_instance(f"{seed}:professor:{professor_id}")
+    return professor_fake.name()
+
+# Faker engine: professors of ranks [start, stop)
+def generate_professors_faker(start, stop):
+    per_course = professors_per_course_count()
+    professor_fake = Faker()
+    for block_start in range(start, stop, block_size):
+        rows = []
+        for rank in range(block_start, min(block_start + block_size, stop)):
+            professor_id = professor_id_for_rank(rank)
+            professor_name = professor_name_faker(professor_fake, professor_id)
+            rows.append([professor_id, professor_name, generate_email(professor_name), 100000 + rank // per_course])
+        yield dict(zip(normalized_tables['professors'], zip(*rows)))
+
+# Name pools of the vectorized engine: every distinct first and last name of the Faker locale with its email-formatted
+# version and cumulative weight, so the pooled names keep the frequencies of one Faker call per name
+def build_name_pools():
+    person = Faker().provider('faker.providers.person')
+    pools = []
+    for names in (person.first_names, person.last_names):
+        weights = np.array(list(names.values()) if isinstance(names, dict) else [1.0] * len(names))
+        names = list(names)
+        pools.append((
+            np.array(names, dtype=object),
+            np.array([name.lower().replace(" ", "_") for name in names], dtype=object),
+            np.cumsum(weights / weights.sum())
+        ))
+    return pools
+
+# Map uniform values in [0, 1) to positions in a name pool through its cumulative weights
+def pick_names(cumulative_weights, values):
+    return np.minimum(np.searchsorted(cumulative_weights, values, side='right'), len(cumulative_weights) - 1)
+
+# Names and emails of generated professors, hashed from the professor ids so every shard agrees on them
+def professor_names_vectorized(professor_ids, pools):
+    (first_names, first_emails, first_weights), (last_names, last_emails, last_weights) = pools
+    first = pick_names(first_weights, (professor_ids * 2654435761 + seed) % 2**32 / 2**32)
+    last = pick_names(last_weights, (professor_ids * 2246822519 + seed) % 2**32 / 2**32)
+    return (
+        first_names[first] + " " + last_names[last],
+        first_emails[first] + "_" + last_emails[last] + "@gmail.com"
+    )
+
+# Vectorized engine: every column of a block is drawn as a NumPy array and names come from the precomputed pools
+def generate_blocks_vectorized(shard, start, stop):
+    # Every shard has its own seeded generator so the output only depends on the seed and shard count
+    rng = np.random.default_rng([seed, shard])
+
+    # Student ids are drawn from the shard's own block of the id range so they stay unique across shards
+    student_ids = skip_fixed_ids(rng.permutation(stop - start) + 100000 + start, fixed_student_ids)
+
+    # Lookup tables indexed by course position
+    pools = build_name_pools()
+    (first_names, first_emails, first_weights), (last_names, last_emails, last_weights) = pools
+    course_name_table = np.array(course_names, dtype=object)
+    course_content_table = np.array([generate_course_content(name) for name in course_names], dtype=object)
+    title_table = np.array([generate_assignment_titles(name) for name in course_names], dtype=object)
+    status_table = np.array(['Yes', 'No'], dtype=object)
+    weights = course_weights()
+    per_course = professors_per_course_count()
+
+    for block_start in range(start, stop, block_size):
+        block_stop = min(block_start + block_size, stop)
+        count = block_stop - block_start
+        positions = np.arange(block_start, block_stop)
+
+        # One value per student
+        course_index = rng.choice(len(course_names), size=count, p=weights)
+        student_first = pick_names(first_weights, rng.random(count))
+        student_last = pick_names(last_weights, rng.random(count))
+        professor_ids = professor_id_for_rank(course_index * per_course + rng.integers(0, per_course, count))
+        professor_names, professor_emails = professor_names_vectorized(professor_ids, pools)
+        assignment_counts = rng.integers(assignments_per_student[0], assignments_per_student[1] + 1, count)
+
+        # One value per assignment; `student` maps every assignment back to its student
+        student = np.repeat(np.arange(count), assignment_counts)
+        total = len(student)
+        assignment_number = np.arange(total) - np.repeat(np.cumsum(assignment_counts) - assignment_counts, assignment_counts)
+        title_index = rng.integers(0, title_table.shape[1], total)
+        status_index = rng.integers(0, 2, total)
+        scores = np.where(status_index == 0, rng.integers(18, 31, total), 0)
+        course_index = course_index[student]
+
+        yield {
+            'course_id': (100000 + course_index).tolist(),
+            'course_name': course_name_table[course_index],
+            'course_content': course_content_table[course_index],
+            'student_id': student_ids[positions[student] - start].tolist(),
+            'student_name': (first_names[student_first] + " " + last_names[student_last])[student],
+            'student_email_address': (first_emails[student_first] + "_" + last_emails[student_last] + "@gmail.com")[student],
+            'professor_id': professor_ids[student].tolist(),
+            'professor_name': professor_names[student],
+            'professor_email_address': professor_emails[student],
+            'assignment_id': assignment_id_for(positions[student], assignment_number).tolist(),
+            'assignment_title': title_table[course_index, title_index],
+            'submission_status': status_table[status_index],
+            'score': scores.tolist()
+        }
+
+# Vectorized engine: professors of ranks [start, stop)
+def generate_professors_vectorized(start, stop):
+    pools = build_name_pools()
+    per_course = professors_per_course_count()
+    for block_start in range(start, stop, block_size):
+        ranks = np.arange(block_start, min(block_start + block_size, stop))
+        professor_ids = professor_id_for_rank(ranks)
+        professor_names, professor_emails = professor_names_vectorized(professor_ids, pools)
+        yield {
+            'professor_id': professor_ids.tolist(),
+            'professor_name': professor_names,
+            'professor_email_address': professor_emails,
+            'course_id': (100000 + ranks // per_course).tolist()
+        }
+
+# Function to build the block of fixed records for Vidhya Harini, Nuthan Puli and Armando Ruggeri
+def fixed_records_block():
     # Assigning Vidhya Harini and Nuthan Puli to specific IDs
     student_data = [
         {"name": "Vidhya Harini", "student_id": 533994, "course_name": "Data Analysis"},
@@ -243,79 +657,90 @@ def generate_all_data():
         {"professor_name": "Armando Ruggeri", "professor_id": 676734, "course_name": "Data Analysis"}
     ]
 
-    print("Starting to generate data...")
-
-    with open(combined_file, 'w', newline='') as f:
-        writer = csv.writer(f)
+    rows = []
+    for index, student in enumerate(student_data):
+        student_id = student["student_id"]
+        student_name = student["name"]
+        student_email_address = generate_email(student_name)
         
-        # Insert the specific records for Vidhya Harini and Nuthan Puli
-        for student in student_data:
-            student_id = student["student_id"]
-            student_name = student["name"]
-            student_email_address = generate_email(student_name)
-            
-            # Get a random course_name from the course_names list
-            course_name = student["course_name"]
-            course_content = generate_course_content(course_name)
-            course_id = 100015
-            
-            professor = professor_data[0]  # Armando Ruggeri for Data Analysis
-            professor_id = professor["professor_id"]
-            professor_name = professor["professor_name"]
-            professor_email_address = generate_email(professor_name)
-            
-            # Assignments and submission status
-            assignment_title = "Database: Course Management System"  # Fixed title for both students
-            assignment_id = random.choice(assignment_ids)
-            submission_status = "No"  # Submission status for Vidhya Harini and Nuthan Puli
-            score = 0  # Score is 0 for "No" submission
-            
-            # Write header only once
-            if f.tell() == 0:  # Check if file is empty before writing header
-                writer.writerow([ 
-                    'course_id', 'course_name', 'course_content',
-                    'student_id', 'student_name', 'student_email_address',
-                    'professor_id', 'professor_name', 'professor_email_address',
-                    'assignment_id', 'assignment_title', 'submission_status', 'score'
-                ])
-            
-            # Write record for each student
-            writer.writerow([ 
-                course_id, course_name, course_content,
-                student_id, student_name, student_email_address,
-                professor_id, professor_name, professor_email_address,
-                assignment_id, assignment_title, submission_status, score
-            ])
+        course_name = student["course_name"]
+        course_content = generate_course_content(course_name)
+        course_id = 100015
         
-        # Generate remaining records for other students and courses (if needed)
-        for i in range(num_records):
-            student_id = student_ids[i]
-            professor_id = professor_ids[i % len(professor_ids)]
-            
-            # Randomly pick a course name and its content
-            course_name = random.choice(course_names)
-            course_id = 100000 + course_names.index(course_name)  # Assigning unique ID
-            
-            student_name = fake.name()
-            professor_name = fake.name()
+        professor = professor_data[0]  # Armando Ruggeri for Data Analysis
+        professor_id = professor["professor_id"]
+        professor_name = professor["professor_name"]
+        professor_email_address = generate_email(professor_name)
+        
+        # Assignments and submission status, with the reserved ids the Query 3 updates refer to
+        assignment_title = "Database: Course Management System"  # Fixed title for both students
+        assignment_id = fixed_assignment_ids[index]
+        submission_status = "No"  # Submission status for Vidhya Harini and Nuthan Puli
+        score = 0  # Score is 0 for "No" submission
+        
+        rows.append([ 
+            course_id, course_name, course_content,
+            student_id, student_name, student_email_address,
+            professor_id, professor_name, professor_email_address,
+            assignment_id, assignment_title, submission_status, score
+        ])
+    return dict(zip(csv_header, zip(*rows)))
 
-            # Handle assignments
-            assignment_titles = generate_assignment_titles(course_name)
-            assignment_title = random.choice(assignment_titles)
-            assignment_id = assignment_ids[i % len(assignment_ids)]
-            submission_status = random.choice(['Yes', 'No'])
-            score = random.randint(18, 30) if submission_status == "Yes" else 0
+# Function to concatenate the part files into a single file, keeping a single header
+def merge_shard_files(paths, target):
+    if output_format == "csv":
+        with open(target, 'w', newline='') as out:
+            for index, path in enumerate(paths):
+                with open(path, 'r', newline='') as part:
+                    header = part.readline()
+                    if index == 0:
+                        out.write(header)
+                    shutil.copyfileobj(part, out)
+    else:
+        writer = None
+        for path in paths:
+            if output_format == "parquet":
+                part = pq.ParquetFile(path)
+                schema, batches = part.schema_arrow, part.iter_batches()
+            else:
+                part = pa.ipc.open_file(pa.memory_map(path, 'r'))
+                schema, batches = part.schema, (part.get_batch(i) for i in range(part.num_record_batches))
+            if writer is None:
+                writer = pq.ParquetWriter(target, schema) if output_format == "parquet" else pa.ipc.new_file(target, schema)
+            for batch in batches:
+                if output_format == "parquet":
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+        writer.close()
 
-            course_content = generate_course_content(course_name)
+    for path in paths:
+        os.remove(path)
+    print(f"Merged {len(paths)} shards into {target}.")
+
+def generate_all_data():
+    if not 1 <= assignments_per_student[0] <= assignments_per_student[1]:
+        raise ValueError("assignments_per_student must be a (min, max) range with 1 <= min <= max.")
+
+    print("Starting to generate data...")
+
+    shards = [(shard, start, stop) for shard, (start, stop) in enumerate(shard_ranges(num_records, num_shards))]
+
+    # Generating every shard in its own process
+    if num_workers > 1:
+        with Pool(num_workers) as pool:
+            shard_paths = pool.starmap(generate_shard, shards)
+    else:
+        shard_paths = [generate_shard(*args) for args in shards]
 
-            # Write the record
-            writer.writerow([ 
-                course_id, course_name, course_content,
-                student_id, student_name, generate_email(student_name),
-                professor_id, professor_name, generate_email(professor_name),
-                assignment_id, assignment_title, submission_status, score
-            ])
+    # Merging the shards of every output table or leaving them as a multi-file dataset
+    for table in shard_paths[0]:
+        paths = [shard[table] for shard in shard_paths]
+        if merge_shards:
+            merge_shard_files(paths, table_path(table))
+        else:
+            print(f"Dataset left as {len(paths)} part files: {', '.join(paths)}")
 
 if __name__ == "__main__":
     generate_all_data()
-    print("Data generation completed for 1,000,000 records.")
\ No newline at end of file
+    print(f"Data generation completed for {num_records:,} records.")
\ No newline at end of file
@@ -1,17 +1,65 @@
 import time
 import os
+import json
 import pandas as pd
 import numpy as np
 from pymongo import MongoClient
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from concurrent.futures import ThreadPoolExecutor
+from cms_dataset import read_dataset, count_records, slice_records, read_normalized_dataset, slice_normalized, split_records, student_boundary
+from cms_snapshot import snapshot_key, save_snapshot, restore_snapshot
 
 # MongoDB connection
-MONGO_URI = "mongodb://localhost:27017/"
+MONGO_HOST = "localhost"
+MONGO_URI = f"mongodb://{MONGO_HOST}:27017/"
 DATABASE_NAME = "course_management_system"
 
+# Dataset path: the generated CSV, or a Parquet/Arrow file written with output_format in faker_code_1mil.py
 dataset = '1_mil_records.csv'
 NUM_EXPERIMENTS = 31
 
+# Benchmark sizes. With INCREMENTAL the loaded data is kept between sizes and only the records
+# [previous size, size) are appended, instead of tearing down and reloading every size from scratch
+SIZES = [250000, 500000, 750000, 1000000]
+INCREMENTAL = False
+
+# Snapshot cache (cms_snapshot.py): after ingest (and indexing) the MongoDB volume is saved under a key of the dataset hash, the
+# size and the schema variant, and later runs restore it instead of re-ingesting. Needs docker access to the container
+SNAPSHOTS = False
+
+# Ingest mode: "batches" (each collection converted in full, then inserted in ordered batches one collection at a
+# time) or "streaming" (INGEST_CHUNK_SIZE records at a time, with unordered insert_many calls for the four
+# collections running concurrently while the next chunk is converted, so client memory stays flat)
+LOAD_MODE = "batches"
+INGEST_CHUNK_SIZE = 10000
+
+# Normalized export (export_mode = "normalized" in faker_code_1mil.py): load the per-table files instead of `dataset`
+NORMALIZED = False
+normalized_dataset = '1_mil_records_{table}.csv'
+
+# Plan capture: after the timings of every (query, size), record the explain("executionStats") of the query's
+# aggregate, the documents and keys it examined and the indexes it used next to the timings
+CAPTURE_PLANS = True
+
+# Longest text Excel keeps in a cell
+EXCEL_CELL_LIMIT = 32767
+
+# Large-result mode: time the queries through aggregate cursors of FETCH_SIZE documents per batch, decoded as raw BSON
+# documents (RAW_BSON, whose fields are only decoded when read) instead of dicts, and report the time to the first
+# document next to the time to the last document
+LARGE_RESULT_MODE = False
+FETCH_SIZE = 1000
+RAW_BSON = True
+
+# Document model: "normalized" (one collection per table, joined with $lookup) or "embedded" (one EMBEDDED_COLLECTION
+# document per student, holding the course id and name and an array of the student's assignments). With
+# COMPARE_SCHEMA_MODELS both are loaded and queried at each size, side by side in mongodb_schema_models.xlsx
+SCHEMA_MODEL = "normalized"
+COMPARE_SCHEMA_MODELS = False
+EMBEDDED_COLLECTION = "EmbeddedStudents"
+EMBEDDED_ASSIGNMENT_FIELDS = ["assignment_id", "assignment_title", "submission_status", "score"]
+
 # Function to create the database
 def create_database(client):
     db = client[DATABASE_NAME]
@@ -44,21 +92,155 @@ def insert_data(db, df, batch_size=10000):
     for i in range(0, len(assignments_data), batch_size):
         assignments.insert_many(assignments_data[i:i + batch_size])
 
+# Fields of each collection, in insertion order
+COLLECTION_FIELDS = {
+    "Courses": ["course_id", "course_name", "course_content"],
+    "Students": ["student_id", "student_name", "student_email_address", "course_id"],
+    "Professors": ["professor_id", "professor_name", "professor_email_address", "course_id"],
+    "Assignments": ["assignment_id", "assignment_title", "submission_status", "score", "student_id", "course_id"]
+}
+
+# Function to insert the normalized tables, which are already deduplicated so each course is inserted once
+def insert_normalized_data(db, tables, batch_size=10000):
+    for collection_name, fields in COLLECTION_FIELDS.items():
+        documents = tables[collection_name.lower()][fields].to_dict(orient='records')
+        for i in range(0, len(documents), batch_size):
+            db[collection_name].insert_many(documents[i:i + batch_size])
+
+# Function to convert the records [start, stop) into the documents of each collection
+def chunk_documents(data, start, stop):
+    if NORMALIZED:
+        tables = slice_normalized(data, start, stop)
+        return {name: tables[name.lower()][fields].to_dict(orient='records') for name, fields in COLLECTION_FIELDS.items()}
+
+    chunk = slice_records(data, start, stop)
+    return {name: chunk[fields].to_dict(orient='records') for name, fields in COLLECTION_FIELDS.items()}
+
+# Function to stream the records [start, stop) in chunks. The four collections of a chunk are inserted concurrently
+# with ordered=False while the next chunk is built; returns the number of documents inserted
+def insert_data_streaming(db, data, start, stop):
+    inserted = 0
+    pending = []
+
+    with ThreadPoolExecutor(max_workers=len(COLLECTION_FIELDS)) as executor:
+        for chunk_start in range(start, stop, INGEST_CHUNK_SIZE):
+            documents = chunk_documents(data, chunk_start, min(chunk_start + INGEST_CHUNK_SIZE, stop))
+
+            # Waiting for the previous chunk, so at most two chunks are held at a time
+            for future in pending:
+                inserted += len(future.result().inserted_ids)
+            pending = [
+                executor.submit(db[name].insert_many, docs, ordered=False)
+                for name, docs in documents.items() if docs
+            ]
+
+        for future in pending:
+            inserted += len(future.result().inserted_ids)
+
+    return inserted
+
+# Function to load the records [start, stop) with the configured LOAD_MODE; returns the elapsed seconds and the
+# number of documents inserted
+def ingest(db, data, start, stop):
+    start_time = time.time()
+
+    if LOAD_MODE == "streaming":
+        documents = insert_data_streaming(db, data, start, stop)
+    elif NORMALIZED:
+        tables = slice_normalized(data, start, stop)
+        insert_normalized_data(db, tables)
+        documents = sum(len(tables[name.lower()]) for name in COLLECTION_FIELDS)
+    else:
+        insert_data(db, slice_records(data, start, stop))
+        documents = (stop - start) * len(COLLECTION_FIELDS)
+
+    ingest_time = time.time() - start_time
+    print(f"Ingested {stop - start} records ({documents} documents) in {ingest_time:.2f} s ({documents / ingest_time:.0f} docs/s).")
+    return ingest_time, documents
+
+# Function to build the embedded documents of the students [start, stop): each student with its course id and name
+# and the array of its assignments
+def embedded_documents(data, start, stop):
+    if NORMALIZED:
+        tables = slice_normalized(data, start, stop)
+        courses = slice_records(data['courses'], 0, count_records(data['courses']))
+    else:
+        tables = split_records(slice_records(data, start, stop))
+        courses = tables['courses']
+
+    assignments = {}
+    for assignment in tables['assignments'][EMBEDDED_ASSIGNMENT_FIELDS + ['student_id']].to_dict(orient='records'):
+        assignments.setdefault(assignment.pop('student_id'), []).append(assignment)
+
+    students = tables['students'].merge(courses[['course_id', 'course_name']], on='course_id', how='left')
+    documents = students[['student_id', 'student_name', 'student_email_address', 'course_id', 'course_name']].to_dict(orient='records')
+    for document in documents:
+        document['assignments'] = assignments.get(document['student_id'], [])
+    return documents
+
+# Function to load the embedded documents of the records [start, stop) in unordered batches of INGEST_CHUNK_SIZE;
+# returns the elapsed seconds and the number of documents inserted
+def ingest_embedded(db, data, start, stop):
+    start_time = time.time()
+    documents = embedded_documents(data, start, stop)
+    for i in range(0, len(documents), INGEST_CHUNK_SIZE):
+        db[EMBEDDED_COLLECTION].insert_many(documents[i:i + INGEST_CHUNK_SIZE], ordered=False)
+
+    ingest_time = time.time() - start_time
+    print(f"Ingested {stop - start} records ({len(documents)} embedded documents) in {ingest_time:.2f} s.")
+    return ingest_time, len(documents)
+
 # Function to create indexes for each primary key in each tables
 def create_indexes(db):
     db.Students.create_index([("student_id", 1)])
     db.Courses.create_index([("course_id", 1)])
     db.Assignments.create_index([("student_id", 1), ("assignment_id", 1)])
+
+    # Indexes of the Query 2 lookups: the course by name, its students, and the submitted assignments of a student
+    db.Courses.create_index([("course_name", 1)])
+    db.Students.create_index([("course_id", 1)])
+    db.Assignments.create_index([("student_id", 1), ("submission_status", 1)])
     db.Professors.create_index([("professor_id", 1)])
     print("Indexes created.")
 
-# Function to run the query and measure the execution times
+# Function to create the indexes of the embedded collection: the student id, the course name and the multikey index
+# on the status and score of the embedded assignments
+def create_embedded_indexes(db):
+    db[EMBEDDED_COLLECTION].create_index([("student_id", 1)])
+    db[EMBEDDED_COLLECTION].create_index([("course_name", 1)])
+    db[EMBEDDED_COLLECTION].create_index([("assignments.submission_status", 1), ("assignments.score", 1)])
+    print("Embedded indexes created.")
+
+# Function to run the query and measure the execution times, up to the last document of its result
 def run_query(query_func):
     start_time = time.time()
-    results = query_func()
+    query_func()
     end_time = time.time()
     return (end_time - start_time) * 1000  # return time in milliseconds
 
+# Function to stream the results of a query pipeline and measure the times to its first and last documents, in
+# milliseconds
+def stream_query(db, collection_name, pipeline):
+    students = db[collection_name]
+    if RAW_BSON:
+        students = students.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+    start_time = time.time()
+    first_row_time = None
+    for _ in students.aggregate(pipeline(), batchSize=FETCH_SIZE):
+        first_row_time = first_row_time or time.time()
+    end_time = time.time()
+    return ((first_row_time or end_time) - start_time) * 1000, (end_time - start_time) * 1000
+
+# Function to get first and average times to the last document of a streamed query, with those to its first document
+def run_streaming_experiments(stream_func, num_experiments=NUM_EXPERIMENTS):
+    timings = [stream_func() for _ in range(num_experiments)]
+    first_row_times = [first_row_time for first_row_time, _ in timings]
+    execution_times = [last_row_time for _, last_row_time in timings]
+    return execution_times, execution_times[0], np.mean(execution_times[1:]), {
+        "First Time To First Row (ms)": first_row_times[0],
+        "Average Time To First Row (ms)": np.mean(first_row_times[1:])
+    }
+
 # Function to get first and average execution times
 def run_experiments(query_func, num_experiments=NUM_EXPERIMENTS):
     first_execution_time = run_query(query_func)
@@ -72,119 +254,263 @@ def run_experiments(query_func, num_experiments=NUM_EXPERIMENTS):
     avg_execution_time = np.mean(execution_times[1:])  # Average of the 30 execution times
     return execution_times, first_execution_time, avg_execution_time
 
-# Function to return a dictionary of query's
-def get_query_functions(db):
+# Function to return a dictionary of the query's aggregate pipelines (on the Students collection, but Query 2 on Courses)
+def get_query_pipelines(db):
 
     return {
-        "Query 1": lambda: list(db.Students.aggregate([  # Query 1
+        "Query 1": lambda: [  # Query 1
             {"$lookup": {"from": "Courses", "localField": "course_id", "foreignField": "course_id", "as": "course"}},
             {"$unwind": "$course"},
             {"$match": {"course.course_name": "Data Analysis"}},
             {"$project": {"student_id": 1, "student_name": 1}},
             {"$limit": 10}
-        ])),
+        ],
+
+        # Query 2 runs server-side from the course: an indexed match on its name, then the students of the course,
+        # each with a correlated lookup of one submitted assignment, stopping at the 10th student that has one. The
+        # denormalized load inserts a course document per record, so only the first matching course is looked up
+        "Query 2": lambda: [  # Query 2
+            {"$match": {"course_name": "Data Analysis"}},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": "Students",
+                "localField": "course_id",
+                "foreignField": "course_id",
+                "pipeline": [
+                    {"$lookup": {
+                        "from": "Assignments",
+                        "localField": "student_id",
+                        "foreignField": "student_id",
+                        "pipeline": [{"$match": {"submission_status": "Yes"}}, {"$limit": 1}],
+                        "as": "submitted"
+                    }},
+                    {"$match": {"submitted": {"$ne": []}}},
+                    {"$limit": 10},
+                    {"$project": {"student_id": 1, "student_name": 1}}
+                ],
+                "as": "students"
+            }},
+            {"$unwind": "$students"},
+            {"$replaceRoot": {"newRoot": "$students"}},
+            {"$limit": 10}
+        ],
+
+        "Query 3": lambda: [  # Query 3
+            {"$match": {"student_id": {"$in": [540214, 533994]}}},
+            {"$lookup": { 
+                "from": "Courses", 
+                "localField": "course_id", 
+                "foreignField": "course_id", 
+                "as": "course" 
+            }},
+            {"$lookup": { 
+                "from": "Assignments", 
+                "localField": "student_id", 
+                "foreignField": "student_id", 
+                "as": "assignments" 
+            }},
+            {"$unwind": "$course" },
+            {"$unwind": "$assignments" },
+            {"$project": {
+                "_id": 0,
+                "student_id": 1,
+                "student_name": 1,
+                "course_id": 1,
+                "course_name": "$course.course_name",
+                "assignment_id": "$assignments.assignment_id",
+                "submission_status": "$assignments.submission_status",
+                "score": "$assignments.score"
+            }},
+            {"$group": {
+                "_id": { 
+                    "student_id": "$student_id", 
+                    "assignment_id": "$assignment_id" 
+                },
+                "student_id": {"$first": "$student_id" },
+                "student_name": {"$first": "$student_name" },
+                "course_id": {"$first": "$course_id" },
+                "course_name": {"$first": "$course_name" },
+                "assignment_id": {"$first": "$assignment_id" },
+                "submission_status": {"$first": "$submission_status" },
+                "score": {"$first": "$score" }
+            }},
+            {"$sort": {"student_id": 1, "assignment_id": 1 }}
+        ],
+
+        "Query 4": lambda: [  # Query 4
+            { "$lookup": {  
+                "from": "Courses",
+                "localField": "course_id",
+                "foreignField": "course_id",
+                "as": "course"
+            }},
+            { "$unwind": "$course" },
 
-        "Query 2": lambda: list(db.Students.aggregate([  # Query 2
-            {"$lookup": {"from": "Courses", "localField": "course_id", "foreignField": "course_id", "as": "course"}},
-            {"$unwind": "$course"},
-            {"$match": {
+            { "$lookup": {  
+                "from": "Assignments",
+                "localField": "student_id",
+                "foreignField": "student_id",
+                "as": "assignments"
+            }},
+            { "$unwind": { "path": "$assignments", "preserveNullAndEmptyArrays": True } },
+
+            { "$match": {  
                 "course.course_name": "Data Analysis",
-                "student_id": {
-                    "$in": list(db.Assignments.find({"submission_status": "yes"}, {"student_id": 1}))  # Fixes `$in`
-                }
+                "assignments.submission_status": "Yes",
+                "assignments.score": { "$gt": 26 }
             }},
+
+            { "$project": {  
+                "_id": 0,
+                "student_id": 1,
+                "student_name": 1,
+                "course_id": 1,
+                "course_name": "$course.course_name",
+                "submission_status": "$assignments.submission_status",
+                "score": "$assignments.score"
+            }}
+        ]
+    }
+
+# Function to return a dictionary of the query's aggregate pipelines rewritten for the embedded collection, where the
+# course and the assignments are already in the student document, so the indexed $match runs first and nothing is joined
+def get_embedded_query_pipelines(db):
+
+    return {
+        "Query 1": lambda: [  # Query 1
+            {"$match": {"course_name": "Data Analysis"}},
             {"$project": {"student_id": 1, "student_name": 1}},
             {"$limit": 10}
-        ])),
-
-        "Query 3": lambda: (  # Query 3
-            db.Students.aggregate([
-                {"$match": {"student_id": {"$in": [540214, 533994]}}},
-                {"$lookup": { 
-                    "from": "Courses", 
-                    "localField": "course_id", 
-                    "foreignField": "course_id", 
-                    "as": "course" 
-                }},
-                {"$lookup": { 
-                    "from": "Assignments", 
-                    "localField": "student_id", 
-                    "foreignField": "student_id", 
-                    "as": "assignments" 
-                }},
-                {"$unwind": "$course" },
-                {"$unwind": "$assignments" },
-                {"$project": {
-                    "_id": 0,
-                    "student_id": 1,
-                    "student_name": 1,
-                    "course_id": 1,
-                    "course_name": "$course.course_name",
-                    "assignment_id": "$assignments.assignment_id",
-                    "submission_status": "$assignments.submission_status",
-                    "score": "$assignments.score"
-                }},
-                {"$group": {
-                    "_id": { 
-                        "student_id": "$student_id", 
-                        "assignment_id": "$assignment_id" 
-                    },
-                    "student_id": {"$first": "$student_id" },
-                    "student_name": {"$first": "$student_name" },
-                    "course_id": {"$first": "$course_id" },
-                    "course_name": {"$first": "$course_name" },
-                    "assignment_id": {"$first": "$assignment_id" },
-                    "submission_status": {"$first": "$submission_status" },
-                    "score": {"$first": "$score" }
-                }},
-                {"$sort": {"student_id": 1, "assignment_id": 1 }}
-            ])
-        ),
-
-        "Query 4": lambda: (  # Query 4
-            db.Students.aggregate([
-                { "$lookup": {  
-                    "from": "Courses",
-                    "localField": "course_id",
-                    "foreignField": "course_id",
-                    "as": "course"
-                }},
-                { "$unwind": "$course" },
-
-                { "$lookup": {  
-                    "from": "Assignments",
-                    "localField": "student_id",
-                    "foreignField": "student_id",
-                    "as": "assignments"
-                }},
-                { "$unwind": { "path": "$assignments", "preserveNullAndEmptyArrays": True } },
-
-                { "$match": {  
-                    "course.course_name": "Data Analysis",
-                    "assignments.submission_status": "Yes",
-                    "assignments.score": { "$gt": 26 }
-                }},
-
-                { "$project": {  
-                    "_id": 0,
-                    "student_id": 1,
-                    "student_name": 1,
-                    "course_id": 1,
-                    "course_name": "$course.course_name",
-                    "submission_status": "$assignments.submission_status",
-                    "score": "$assignments.score"
-                }}
-            ])
-        )
+        ],
+
+        "Query 2": lambda: [  # Query 2
+            {"$match": {"course_name": "Data Analysis", "assignments.submission_status": "Yes"}},
+            {"$project": {"student_id": 1, "student_name": 1}},
+            {"$limit": 10}
+        ],
+
+        "Query 3": lambda: [  # Query 3
+            {"$match": {"student_id": {"$in": [540214, 533994]}}},
+            {"$unwind": "$assignments"},
+            {"$project": {
+                "_id": 0,
+                "student_id": 1,
+                "student_name": 1,
+                "course_id": 1,
+                "course_name": 1,
+                "assignment_id": "$assignments.assignment_id",
+                "submission_status": "$assignments.submission_status",
+                "score": "$assignments.score"
+            }},
+            {"$sort": {"student_id": 1, "assignment_id": 1}}
+        ],
+
+        "Query 4": lambda: [  # Query 4
+            {"$match": {
+                "course_name": "Data Analysis",
+                "assignments": {"$elemMatch": {"submission_status": "Yes", "score": {"$gt": 26}}}
+            }},
+            {"$unwind": "$assignments"},
+            {"$match": {"assignments.submission_status": "Yes", "assignments.score": {"$gt": 26}}},
+            {"$project": {
+                "_id": 0,
+                "student_id": 1,
+                "student_name": 1,
+                "course_id": 1,
+                "course_name": 1,
+                "submission_status": "$assignments.submission_status",
+                "score": "$assignments.score"
+            }}
+        ]
     }
 
-# Function to clear the collections instead of dropping the whole database
+# Collection the queries of each document model start from, and their pipelines. QUERY_COLLECTIONS holds the
+# queries that start from another collection
+MODEL_COLLECTIONS = {"normalized": "Students", "embedded": EMBEDDED_COLLECTION}
+QUERY_COLLECTIONS = {("normalized", "Query 2"): "Courses"}
+MODEL_PIPELINES = {"normalized": get_query_pipelines, "embedded": get_embedded_query_pipelines}
+
+# Function to get the collection a query of a document model starts from
+def query_collection(model, query_name):
+    return QUERY_COLLECTIONS.get((model, query_name), MODEL_COLLECTIONS[model])
+
+# Function to return a dictionary of query's of a document model, each draining its aggregate cursor
+def get_query_functions(db, model="normalized"):
+    pipelines = MODEL_PIPELINES[model](db)
+
+    return {
+        query_name: lambda collection=db[query_collection(model, query_name)], pipeline=pipeline:
+            list(collection.aggregate(pipeline()))
+        for query_name, pipeline in pipelines.items()
+    }
+
+# Function to count the documents and bytes of a query's results over one more execution, reading the documents as
+# raw BSON, which keeps the bytes the server sent
+def result_size(db, collection_name, pipeline):
+    students = db[collection_name].with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+    documents = list(students.aggregate(pipeline))
+    return len(documents), sum(len(document.raw) for document in documents)
+
+# Function to sum the documents and keys examined over every stage of an explain, and collect the indexes used
+def explain_stats(node, stats):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ("totalDocsExamined", "totalKeysExamined") and isinstance(value, int):
+                stats[key] += value
+            elif key == "indexName":
+                stats["indexes"].add(value)
+            elif key == "indexesUsed":
+                stats["indexes"].update(value)
+            else:
+                explain_stats(value, stats)
+    elif isinstance(node, list):
+        for value in node:
+            explain_stats(value, stats)
+    return stats
+
+# Function to list the stages of a winning plan in execution order, from the leaf stage up to the root
+def winning_plan_stages(plan):
+    stages = []
+    plan = plan.get("queryPlan", plan)
+    while plan:
+        stages.append(plan["stage"])
+        plan = plan.get("inputStage")
+    return stages[::-1]
+
+# Function to capture the plan of a query once with explain("executionStats"), which runs the aggregate
+def capture_plan(db, collection_name, pipeline):
+    explain = db.command("explain", {"aggregate": collection_name, "pipeline": pipeline, "cursor": {}},
+                         verbosity="executionStats")
+    stats = explain_stats(explain, {"totalDocsExamined": 0, "totalKeysExamined": 0, "indexes": set()})
+
+    # Pipelines that are not pushed down entirely into the query layer report a $cursor stage and then their own stages
+    if "stages" in explain:
+        cursor = explain["stages"][0].get("$cursor", {})
+        stages = winning_plan_stages(cursor.get("queryPlanner", {}).get("winningPlan", {}))
+        stages += [next(iter(stage)) for stage in explain["stages"][1:]]
+        returned = explain["stages"][-1].get("nReturned")
+    else:
+        stages = winning_plan_stages(explain["queryPlanner"]["winningPlan"])
+        returned = explain["executionStats"]["nReturned"]
+
+    return {
+        "Plan Summary": " -> ".join(stages),
+        "Docs Examined": stats["totalDocsExamined"],
+        "Keys Examined": stats["totalKeysExamined"],
+        "Docs Returned": returned,
+        "Indexes Used": ", ".join(sorted(stats["indexes"])),
+        "Execution Plan": json.dumps(explain, default=str)[:EXCEL_CELL_LIMIT]
+    }
+
+# Function to clear the collections and return the time it took. Dropping a collection removes its files at once
+# instead of deleting every document and index entry; create_indexes builds the indexes again after the next load
 def clear_collections(db):
-    db.Courses.delete_many({})
-    db.Students.delete_many({})
-    db.Professors.delete_many({})
-    db.Assignments.delete_many({})
-    print("Collections cleared.")
+    start_time = time.time()
+    for collection_name in [*COLLECTION_FIELDS, EMBEDDED_COLLECTION]:
+        db[collection_name].drop()
+    reset_time = time.time() - start_time
+    print(f"Collections cleared in {reset_time:.2f} s.")
+    return reset_time
 
 # Function to run the queries parallely using ThreadPoolExecutor
 def run_queries_parallel(query_functions, db):
@@ -198,7 +524,10 @@ def main():
     db = create_database(client)
 
     # Loading the dataset
-    data = pd.read_csv(dataset)
+    if NORMALIZED:
+        data = read_normalized_dataset(normalized_dataset)
+    else:
+        data = read_dataset(dataset)
 
     # Creating output directory
     output_dir = "/app/output"
@@ -206,36 +535,85 @@ def main():
 
     # DataFrame to store experiment results
     results = []
+    models = ["normalized", "embedded"] if COMPARE_SCHEMA_MODELS else [SCHEMA_MODEL]
 
     # Running for different data sizes
-    for size in [250000, 500000, 750000, 1000000]:
+    for i, size in enumerate(SIZES):
         print(f"Running experiments for {size} records...")
-        df_subset = data.iloc[:size]
-
-        # Inserting data into MongoDB
-        insert_data(db, df_subset)
-
-        # Creating indexes
-        create_indexes(db)
-
-        # Queries
-        query_functions = get_query_functions(db)
-
-        # Running experiments for each query
-        for query_name, query_func in query_functions.items():
-            print(f"Running {query_name} for {size} records...")
-            execution_times, first_execution_time, avg_execution_time = run_experiments(query_func)
-
-            # Adding results to the DataFrame
-            results.append({
-                "Records": size,
-                "Query": query_name,
-                "First Execution Time (ms)": first_execution_time,
-                "Average Execution Time (ms)": avg_execution_time
-            })
-
-        # Clearing collections after each experiment
-        clear_collections(db)
+        # Increments start and stop on student boundaries, so no student is split between two of them
+        start = student_boundary(data, SIZES[i - 1]) if INCREMENTAL and i > 0 else 0
+        stop = student_boundary(data, size)
+
+        # Restoring the loaded data from a snapshot, or ingesting it (and saving a snapshot)
+        key = snapshot_key(normalized_dataset if NORMALIZED else dataset, size,
+                           "normalized" if NORMALIZED else "denormalized", LOAD_MODE, *models) if SNAPSHOTS else None
+        restore_time = restore_snapshot('mongodb', key, MONGO_HOST) if key else None
+        restored = restore_time is not None
+        reset_time = 0
+        if restored:
+            ingest_times = dict.fromkeys(models, restore_time)
+            documents = {
+                "normalized": sum(db[name].estimated_document_count() for name in COLLECTION_FIELDS),
+                "embedded": db[EMBEDDED_COLLECTION].estimated_document_count()
+            }
+        else:
+            # Clearing the collections before a full load
+            if start == 0:
+                reset_time = clear_collections(db)
+
+            # Inserting data into MongoDB and creating indexes, for each document model
+            ingest_times, documents = {}, {}
+            if "normalized" in models:
+                ingest_times["normalized"], documents["normalized"] = ingest(db, data, start, stop)
+                create_indexes(db)
+            if "embedded" in models:
+                ingest_times["embedded"], documents["embedded"] = ingest_embedded(db, data, start, stop)
+                create_embedded_indexes(db)
+            if key:
+                save_snapshot('mongodb', key, MONGO_HOST)
+
+        for model in models:
+            # Queries
+            query_functions = get_query_functions(db, model)
+            query_pipelines = MODEL_PIPELINES[model](db)
+            ingest_time = ingest_times[model]
+
+            # Running experiments for each query
+            for query_name, query_func in query_functions.items():
+                print(f"Running {query_name} ({model}) for {size} records...")
+                collection_name = query_collection(model, query_name)
+                if LARGE_RESULT_MODE:
+                    execution_times, first_execution_time, avg_execution_time, stream_info = run_streaming_experiments(
+                        lambda: stream_query(db, collection_name, query_pipelines[query_name]))
+                else:
+                    execution_times, first_execution_time, avg_execution_time = run_experiments(query_func)
+                    stream_info = {}
+
+                # Capturing the plan after the timings, so it does not warm up the first execution
+                plan_info = capture_plan(db, collection_name, query_pipelines[query_name]()) if CAPTURE_PLANS else {}
+                result_rows, result_bytes = result_size(db, collection_name, query_pipelines[query_name]())
+
+                # Adding results to the DataFrame
+                results.append({
+                    "Records": size,
+                    "Query": query_name,
+                    "Schema Model": model,
+                    "First Execution Time (ms)": first_execution_time,
+                    "Average Execution Time (ms)": avg_execution_time,
+                    "Result Rows": result_rows,
+                    "Result Bytes": result_bytes,
+                    **stream_info,
+                    "Ingested Records": stop - start,
+                    "Ingest Time (s)": ingest_time,
+                    "Ingest Rows/s": (stop - start) / ingest_time,
+                    "Ingest Docs/s": documents[model] / ingest_time,
+                    "Restored From Snapshot": restored,
+                    "Reset Time (s)": reset_time,
+                    **plan_info
+                })
+
+    # Clearing collections after the experiments
+    clear_collections(db)
 
     # Save results to an Excel file
     output_file = os.path.join(output_dir, "mongodb_query_execution_times.xlsx")
@@ -243,6 +621,21 @@ def main():
     results_df.to_excel(output_file, index=False)
     print(f"Results saved to {output_file}")
 
+    # Saving the normalized and embedded models side by side
+    if COMPARE_SCHEMA_MODELS:
+        models_file = os.path.join(output_dir, "mongodb_schema_models.xlsx")
+        with pd.ExcelWriter(models_file) as writer:
+            results_df.pivot_table(
+                index=["Records", "Query"], columns="Schema Model", values="Average Execution Time (ms)"
+            ).to_excel(writer, sheet_name="Timings")
+            results_df.pivot_table(
+                index=["Records", "Query"], columns="Schema Model", values="Result Rows"
+            ).to_excel(writer, sheet_name="Result Rows")
+            results_df.pivot_table(
+                index="Records", columns="Schema Model", values=["Ingest Time (s)", "Ingest Docs/s"]
+            ).to_excel(writer, sheet_name="Ingest")
+        print(f"Schema model comparison saved to {models_file}")
+
     # Closing the MongoDB connection
     client.close()
     print("Experiments completed successfully.")
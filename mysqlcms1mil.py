@@ -3,6 +3,13 @@ import pymysql
 import time
 import numpy as np
 import os
+import re
+import json
+import queue
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from cms_dataset import read_dataset, slice_records, read_normalized_dataset, slice_normalized, split_records, student_boundary
+from cms_snapshot import snapshot_key, save_snapshot, restore_snapshot
 
 # MySQL connection
 MYSQL_HOST = '172.18.0.2'
@@ -11,9 +18,50 @@ MYSQL_USER = 'root'
 MYSQL_PASSWORD = 'dbpasscms'
 MYSQL_DATABASE = 'course_management_system'
 
+# Dataset path: the generated CSV, or a Parquet/Arrow file written with output_format in faker_code_1mil.py
 dataset = '1_mil_records.csv'
 NUM_EXPERIMENTS = 31
 
+# Benchmark sizes. With INCREMENTAL the loaded data is kept between sizes and only the records
+# [previous size, size) are appended, instead of tearing down and reloading every size from scratch
+SIZES = [250000, 500000, 750000, 1000000]
+INCREMENTAL = False
+
+# Snapshot cache (cms_snapshot.py): after ingest the MySQL volume is saved under a key of the dataset hash, the
+# size and the schema variant, and later runs restore it instead of re-ingesting. Needs docker access to the container
+SNAPSHOTS = False
+
+# Ingest mode: "executemany" (row-by-row INSERT IGNORE), "load_data" (LOAD DATA LOCAL INFILE from a temporary
+# file per table, with foreign_key_checks/unique_checks off and the foreign keys added after the load) or
+# "parallel" (LOAD_WORKERS connections running multi-row INSERTs of INSERT_CHUNK_SIZE rows, one commit per chunk)
+LOAD_MODE = "executemany"
+LOAD_WORKERS = 8
+INSERT_CHUNK_SIZE = 5000
+
+# Tables loaded together in "parallel" mode; each stage only starts once the tables it references are loaded
+LOAD_STAGES = [["Courses"], ["Students", "Professors"], ["Assignments"]]
+
+# Normalized export (export_mode = "normalized" in faker_code_1mil.py): load the per-table files instead of `dataset`
+NORMALIZED = False
+normalized_dataset = '1_mil_records_{table}.csv'
+
+# Index comparison: query every size once per variant of INDEX_VARIANTS, saving the EXPLAIN FORMAT=JSON plans and the
+# timings of the variants side by side in mysql_index_variants.xlsx
+COMPARE_INDEX_VARIANTS = False
+
+# Plan capture: after the timings of every (query, size), record the query's execution plan, the rows it examined
+# and the indexes it used next to the timings
+CAPTURE_PLANS = True
+
+# Longest text Excel keeps in a cell
+EXCEL_CELL_LIMIT = 32767
+
+# Large-result mode: time the queries through an unbuffered SSCursor that streams the rows from the server (the first
+# row read on its own, the rest FETCH_SIZE rows per fetchmany call), and report the time to the first row next to the
+# time to the last row
+LARGE_RESULT_MODE = False
+FETCH_SIZE = 1000
+
 # Function to connect to MySQL database
 def connect_to_db():
     connection = pymysql.connect(
@@ -21,7 +69,8 @@ def connect_to_db():
         port=MYSQL_PORT,
         user=MYSQL_USER,
         password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE
+        database=MYSQL_DATABASE,
+        local_infile=True
     )
     return connection
 
@@ -30,8 +79,30 @@ def create_database(cursor):
     cursor.execute(f"CREATE DATABASE IF NOT EXISTS {MYSQL_DATABASE}")
     print(f"Database '{MYSQL_DATABASE}' created or already exists.")
 
+# Function to reset the database to empty tables and return the reset time in seconds. DROP DATABASE removes the
+# tablespaces as files, so it does not grow with the row count like a DELETE does
+def reset_database(cursor):
+    start_time = time.time()
+    cursor.execute(f"DROP DATABASE IF EXISTS {MYSQL_DATABASE}")
+    create_database(cursor)
+    cursor.execute(f"USE {MYSQL_DATABASE}")
+    create_tables(cursor, with_foreign_keys=LOAD_MODE != "load_data")
+    reset_time = time.time() - start_time
+    print(f"Database '{MYSQL_DATABASE}' reset in {reset_time:.2f} s.")
+    return reset_time
+
+# Foreign keys of each table
+FOREIGN_KEYS = {
+    "Students": ["FOREIGN KEY (course_id) REFERENCES Courses(course_id)"],
+    "Professors": ["FOREIGN KEY (course_id) REFERENCES Courses(course_id)"],
+    "Assignments": [
+        "FOREIGN KEY (student_id) REFERENCES Students(student_id)",
+        "FOREIGN KEY (course_id) REFERENCES Courses(course_id)"
+    ]
+}
+
 # Function to create tables
-def create_tables(cursor):
+def create_tables(cursor, with_foreign_keys=True):
     tables = {
         "Courses": (
             "CREATE TABLE IF NOT EXISTS Courses ("
@@ -45,8 +116,7 @@ def create_tables(cursor):
             "  student_id INT PRIMARY KEY,"
             "  student_name VARCHAR(255),"
             "  student_email_address VARCHAR(255),"
-            "  course_id INT,"
-            "  FOREIGN KEY (course_id) REFERENCES Courses(course_id)"
+            "  course_id INT"
             ")"
         ),
         "Professors": (
@@ -54,8 +124,7 @@ def create_tables(cursor):
             "  professor_id INT PRIMARY KEY,"
             "  professor_name VARCHAR(255),"
             "  professor_email_address VARCHAR(255),"
-            "  course_id INT,"
-            "  FOREIGN KEY (course_id) REFERENCES Courses(course_id)"
+            "  course_id INT"
             ")"
         ),
         "Assignments": (
@@ -65,17 +134,145 @@ def create_tables(cursor):
             "  submission_status VARCHAR(3),"
             "  score INT,"
             "  student_id INT,"
-            "  course_id INT,"
-            "  FOREIGN KEY (student_id) REFERENCES Students(student_id),"
-            "  FOREIGN KEY (course_id) REFERENCES Courses(course_id)"
+            "  course_id INT"
             ")"
         )
     }
 
     for table_name, create_query in tables.items():
+        # Foreign keys are part of the table definition unless they are added after a bulk load
+        if with_foreign_keys and table_name in FOREIGN_KEYS:
+            create_query = create_query[:-1] + ", " + ", ".join(FOREIGN_KEYS[table_name]) + ")"
         cursor.execute(create_query)
         print(f"Created or verified table: {table_name}")
 
+# Function to add the foreign keys (and the indexes backing them) to tables created without them
+def add_foreign_keys(cursor):
+    for table_name, foreign_keys in FOREIGN_KEYS.items():
+        cursor.execute(f"ALTER TABLE {table_name} " + ", ".join(f"ADD {foreign_key}" for foreign_key in foreign_keys))
+        print(f"Added foreign keys to table: {table_name}")
+
+# Index-set variants compared with COMPARE_INDEX_VARIANTS: whether the foreign keys (and the indexes InnoDB creates
+# for them) are present, and the secondary indexes added on top
+INDEX_VARIANTS = {
+    "none": {"foreign_keys": False, "indexes": {}},
+    "fk_only": {"foreign_keys": True, "indexes": {}},
+    "covering": {
+        "foreign_keys": True,
+        "indexes": {
+            "Courses": ["INDEX idx_courses_name (course_name, course_id)"],
+            "Students": ["INDEX idx_students_course (course_id, student_id, student_name)"],
+            "Assignments": [
+                "INDEX idx_assignments_student_status (student_id, submission_status, score)",
+                "INDEX idx_assignments_status_score (submission_status, score, student_id)"
+            ]
+        }
+    }
+}
+
+# Function to replace the foreign keys and secondary indexes of the tables with an index variant. Returns the build
+# time in seconds and the total index size in MB, the write-side cost of the variant
+def apply_index_variant(cursor, variant):
+    start_time = time.time()
+
+    # Dropping the foreign keys first, as they hold on to the indexes backing them
+    cursor.execute(
+        "SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'",
+        (MYSQL_DATABASE,)
+    )
+    for table_name, constraint_name in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {table_name} DROP FOREIGN KEY {constraint_name}")
+    cursor.execute(
+        "SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = %s AND INDEX_NAME <> 'PRIMARY'",
+        (MYSQL_DATABASE,)
+    )
+    for table_name, index_name in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {table_name} DROP INDEX {index_name}")
+
+    # Adding the indexes before the foreign keys, so the foreign keys reuse them where they can
+    for table_name, indexes in INDEX_VARIANTS[variant]["indexes"].items():
+        cursor.execute(f"ALTER TABLE {table_name} " + ", ".join(f"ADD {index}" for index in indexes))
+    if INDEX_VARIANTS[variant]["foreign_keys"]:
+        add_foreign_keys(cursor)
+    build_time = time.time() - start_time
+
+    # Refreshing the statistics the optimizer and information_schema report
+    cursor.execute(f"ANALYZE TABLE {', '.join(TABLE_COLUMNS)}")
+    cursor.fetchall()
+    cursor.execute(
+        "SELECT SUM(INDEX_LENGTH) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s", (MYSQL_DATABASE,)
+    )
+    index_size = float(cursor.fetchone()[0] or 0) / 2 ** 20
+    print(f"Index variant '{variant}' applied in {build_time:.2f} s ({index_size:.1f} MB of secondary indexes).")
+    return build_time, index_size
+
+# Function to list the (table, access type, key) of every table access in an EXPLAIN FORMAT=JSON plan
+def plan_accesses(plan):
+    accesses = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "table_name" in node and "access_type" in node:
+                accesses.append((node['table_name'], node['access_type'], node.get('key')))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return accesses
+
+# Function to summarize an EXPLAIN FORMAT=JSON plan as the access type and key of every table, plus the query cost
+def summarize_plan(plan):
+    cost = plan.get("query_block", {}).get("cost_info", {}).get("query_cost")
+    return f"cost={cost} " + " ".join(f"{table}:{access_type}({key or '-'})" for table, access_type, key in plan_accesses(plan))
+
+# Function to capture the EXPLAIN FORMAT=JSON plan of every statement of a query
+def explain_query(cursor, query_name):
+    plans = []
+    for statement in QUERY_STATEMENTS[query_name]:
+        cursor.execute("EXPLAIN FORMAT=JSON " + statement)
+        plans.append(json.loads(cursor.fetchone()[0]))
+    return plans
+
+# Function to sum the session's Handler_read_* counters, the rows the storage engine has read
+def handler_reads(cursor):
+    cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+    return sum(int(value) for _, value in cursor.fetchall())
+
+# Function to capture the plan of a query once: EXPLAIN ANALYZE of its SELECTs on MySQL 8.0.18+, or the EXPLAIN
+# FORMAT=JSON plans on older servers such as the mysql:5.7 container, plus the rows one execution examines
+def capture_plan(cursor, query_name):
+    statements = QUERY_STATEMENTS[query_name]
+    version = tuple(int(part) for part in re.match(r"(\d+)\.(\d+)\.(\d+)", cursor.connection.get_server_info()).groups())
+
+    reads_before = handler_reads(cursor)
+    for statement in statements:
+        cursor.execute(statement)
+        cursor.fetchall()
+    rows_examined = handler_reads(cursor) - reads_before
+
+    plans = explain_query(cursor, query_name)
+    if version >= (8, 0, 18):
+        analyzed = []
+        for statement in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                cursor.execute("EXPLAIN ANALYZE " + statement)
+                analyzed.append(cursor.fetchone()[0])
+        execution_plan = "\n\n".join(analyzed)
+    else:
+        execution_plan = json.dumps(plans)
+
+    return {
+        "Plan Summary": " | ".join(summarize_plan(plan) for plan in plans),
+        "Rows Examined": rows_examined,
+        "Indexes Used": ", ".join(sorted({key for plan in plans for _, _, key in plan_accesses(plan) if key})),
+        "Execution Plan": execution_plan[:EXCEL_CELL_LIMIT]
+    }
+
 # Function to insert data into each tables
 def insert_data(cursor, df):
     # Inserting data into Courses table
@@ -122,44 +319,142 @@ def insert_data(cursor, df):
         assignments_data
     )
 
-# Function to run the query and measure the execution times
+# Columns of each table, in insertion order
+TABLE_COLUMNS = {
+    "Courses": ["course_id", "course_name", "course_content"],
+    "Students": ["student_id", "student_name", "student_email_address", "course_id"],
+    "Professors": ["professor_id", "professor_name", "professor_email_address", "course_id"],
+    "Assignments": ["assignment_id", "assignment_title", "submission_status", "score", "student_id", "course_id"]
+}
+
+# Function to insert the normalized tables, which are already deduplicated so every row is inserted once
+def insert_normalized_data(cursor, tables):
+    for table_name, columns in TABLE_COLUMNS.items():
+        rows = list(tables[table_name.lower()][columns].itertuples(index=False, name=None))
+        cursor.executemany(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            rows
+        )
+
+# Function to bulk load each table with LOAD DATA LOCAL INFILE, adding the foreign keys afterwards when `add_keys`
+def load_data_infile(cursor, tables, add_keys=False):
+    cursor.execute("SET foreign_key_checks = 0")
+    cursor.execute("SET unique_checks = 0")
+
+    for table_name, columns in TABLE_COLUMNS.items():
+        # Streaming the table's columns into a temporary CSV file the server reads back over the connection
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as f:
+            tables[table_name.lower()][columns].to_csv(f, header=False, index=False, lineterminator='\n')
+            path = f.name
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {table_name} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                "LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})",
+                (path,)
+            )
+        finally:
+            os.remove(path)
+        print(f"Loaded {cursor.rowcount} rows into table: {table_name}")
+
+    # Adding the foreign keys while the checks are still off, so InnoDB adds them in place instead of copying the
+    # tables; the loaded rows reference each other by construction
+    if add_keys:
+        add_foreign_keys(cursor)
+
+    cursor.execute("SET unique_checks = 1")
+    cursor.execute("SET foreign_key_checks = 1")
+
+# Function to load the tables concurrently over a pool of connections, in chunked multi-row INSERTs
+def parallel_insert(tables):
+    connections = queue.Queue()
+    for _ in range(LOAD_WORKERS):
+        connections.put(connect_to_db())
+
+    # Every chunk takes a connection from the pool and is committed on its own
+    def insert_chunk(table_name, columns, rows):
+        connection = connections.get()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT IGNORE INTO {table_name} ({', '.join(columns)}) VALUES "
+                    + ", ".join([f"({', '.join(['%s'] * len(columns))})"] * len(rows)),
+                    [value for row in rows for value in row]
+                )
+            connection.commit()
+        finally:
+            connections.put(connection)
+
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        for stage in LOAD_STAGES:
+            futures = []
+            for table_name in stage:
+                columns = TABLE_COLUMNS[table_name]
+                rows = list(tables[table_name.lower()][columns].itertuples(index=False, name=None))
+                for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+                    futures.append(executor.submit(insert_chunk, table_name, columns, rows[i:i + INSERT_CHUNK_SIZE]))
+
+            # Waiting for the whole stage, raising the first failed chunk
+            for future in futures:
+                future.result()
+            print(f"Loaded tables: {', '.join(stage)}")
+
+    while not connections.empty():
+        connections.get().close()
+
+# Function to load the records [start, stop) in the configured LOAD_MODE and return the ingest time in seconds
+def ingest(connection, cursor, data, start, stop):
+    start_time = time.time()
+
+    if LOAD_MODE == "load_data":
+        tables = slice_normalized(data, start, stop) if NORMALIZED else split_records(slice_records(data, start, stop))
+        # The foreign keys only need adding after the first load; later loads run with the checks off
+        load_data_infile(cursor, tables, add_keys=start == 0)
+    elif LOAD_MODE == "parallel":
+        parallel_insert(slice_normalized(data, start, stop) if NORMALIZED else split_records(slice_records(data, start, stop)))
+    elif NORMALIZED:
+        insert_normalized_data(cursor, slice_normalized(data, start, stop))
+    else:
+        insert_data(cursor, slice_records(data, start, stop))
+    connection.commit()
+
+    ingest_time = time.time() - start_time
+    print(f"Ingested {stop - start} records in {ingest_time:.2f} s ({(stop - start) / ingest_time:.0f} rows/s).")
+    return ingest_time
+
+# Function to run the query and measure the execution times, up to the last row of its result
 def run_query(cursor, query):
     start_time = time.time()
     cursor.execute(query)
+    cursor.fetchall()
     end_time = time.time()
     return (end_time - start_time) * 1000  # returning time in milliseconds
 
-# Query functions for MySQL
-def query_1(cursor):
-    query = """
+# Statements of every query, also used for EXPLAIN
+QUERY_1 = """
         SELECT student_id, student_name 
         FROM Students 
         WHERE course_id = (SELECT course_id FROM Courses WHERE course_name = 'Data Analysis' LIMIT 1) 
         LIMIT 10;
     """
-    return run_query(cursor, query)
 
-def query_2(cursor):
-    query = """
+QUERY_2 = """
         SELECT student_id, student_name
         FROM Students
         WHERE course_id IN (SELECT course_id FROM Courses WHERE course_name = 'Data Analysis')
         AND student_id IN (SELECT student_id FROM Assignments WHERE submission_status = 'yes')
         LIMIT 10;
     """
-    return run_query(cursor, query)
 
-def query_3(cursor):
-    # Updating
-    update_query = """
+QUERY_3_UPDATE = """
         UPDATE Assignments 
         SET submission_status = 'Yes', score = 30 
         WHERE student_id IN (540214, 533994);
     """
-    run_query(cursor, update_query)
 
-    # Fetching
-    select_query = """
+QUERY_3_SELECT = """
         SELECT 
             s.student_id, 
             s.student_name, 
@@ -173,10 +468,8 @@ def query_3(cursor):
         JOIN Assignments a ON s.student_id = a.student_id
         WHERE s.student_id IN (540214, 533994);
     """
-    return run_query(cursor, select_query)
 
-def query_4(cursor):
-    query = """
+QUERY_4 = """
         SELECT s.student_id, s.student_name, s.course_id, c.course_name, a.submission_status, a.score
         FROM Students s
         JOIN Courses c ON s.course_id = c.course_id
@@ -185,7 +478,72 @@ def query_4(cursor):
         AND a.submission_status = 'yes'
         AND a.score > 26;
     """
-    return run_query(cursor, query)
+
+QUERY_STATEMENTS = {
+    "query_1": [QUERY_1],
+    "query_2": [QUERY_2],
+    "query_3": [QUERY_3_UPDATE, QUERY_3_SELECT],
+    "query_4": [QUERY_4]
+}
+
+# Query functions for MySQL
+def query_1(cursor):
+    return run_query(cursor, QUERY_1)
+
+def query_2(cursor):
+    return run_query(cursor, QUERY_2)
+
+def query_3(cursor):
+    # Updating
+    run_query(cursor, QUERY_3_UPDATE)
+
+    # Fetching
+    return run_query(cursor, QUERY_3_SELECT)
+
+def query_4(cursor):
+    return run_query(cursor, QUERY_4)
+
+# Function to get the bytes the server has sent over this session
+def bytes_sent(cursor):
+    cursor.execute("SHOW SESSION STATUS LIKE 'Bytes_sent'")
+    return int(cursor.fetchone()[1])
+
+# Function to count the rows and bytes of a query's results over one more execution. The bytes are the Bytes_sent of
+# its statements: the delta around them less the replies of the status queries, measured by reading it twice first
+def result_size(cursor, query_name):
+    sent_before = bytes_sent(cursor)
+    status_reply = bytes_sent(cursor) - sent_before
+    rows = 0
+    for statement in QUERY_STATEMENTS[query_name]:
+        cursor.execute(statement)
+        rows += len(cursor.fetchall())
+    return rows, bytes_sent(cursor) - sent_before - 2 * status_reply
+
+# Function to stream the statements of a query through an unbuffered cursor and measure the times to the first row of
+# its last statement and to its last row, in milliseconds
+def stream_query(connection, query_name):
+    cursor = connection.cursor(pymysql.cursors.SSCursor)
+    start_time = time.time()
+    first_row_time = None
+    for statement in QUERY_STATEMENTS[query_name]:
+        cursor.execute(statement)
+        # Reading the first row on its own, then draining the rest in batches of FETCH_SIZE
+        first_row_time = time.time() if cursor.fetchone() is not None else None
+        while cursor.fetchmany(FETCH_SIZE):
+            pass
+    end_time = time.time()
+    cursor.close()
+    return ((first_row_time or end_time) - start_time) * 1000, (end_time - start_time) * 1000
+
+# Function to get first and average times to the last row of a streamed query, with those to its first row
+def run_streaming_experiments(stream_func, num_experiments=NUM_EXPERIMENTS):
+    timings = [stream_func() for _ in range(num_experiments)]
+    first_row_times = [first_row_time for first_row_time, _ in timings]
+    execution_times = [last_row_time for _, last_row_time in timings]
+    return execution_times, execution_times[0], np.mean(execution_times[1:]), {
+        "First Time To First Row (ms)": first_row_times[0],
+        "Average Time To First Row (ms)": np.mean(first_row_times[1:])
+    }
 
 # Function to get first and average execution times
 def run_experiments(cursor, query_func, num_experiments=NUM_EXPERIMENTS):
@@ -203,7 +561,10 @@ def run_experiments(cursor, query_func, num_experiments=NUM_EXPERIMENTS):
 # Main function
 def main():
     # Loading the dataset
-    data = pd.read_csv(dataset)
+    if NORMALIZED:
+        data = read_normalized_dataset(normalized_dataset)
+    else:
+        data = read_dataset(dataset)
 
     # Connect to MySQL and getting the cursor
     connection = connect_to_db()
@@ -215,42 +576,92 @@ def main():
 
     # DataFrame to store experiment results
     results = []
+    plans = []
 
     # Running for different data sizes
-    for i, size in enumerate([250000, 500000, 750000, 1000000]):
+    for i, size in enumerate(SIZES):
         print(f"Running experiments for {size} records...")
-        df_subset = data.iloc[:size]
-
-        # Creating database and tables
-        create_database(cursor)
-        cursor.execute(f"USE {MYSQL_DATABASE}")
-        create_tables(cursor)
-
-        # Inserting data
-        insert_data(cursor, df_subset)
-        connection.commit()
-
-        # Running experiments for each query
-        for query_name, query_func in {
-            "query_1": query_1,
-            "query_2": query_2,
-            "query_3": query_3,
-            "query_4": query_4
-        }.items():
-            print(f"Running {query_name} for {size} records...")
-            execution_times, first_execution_time, avg_execution_time = run_experiments(cursor, query_func)
-
-            # Adding results to the DataFrame
-            results.append({
-                "Records": size,
-                "Query": query_name,
-                "First Execution Time (ms)": first_execution_time,
-                "Average Execution Time (ms)": avg_execution_time
-            })
-
-        # Dropping the database
-        cursor.execute(f"DROP DATABASE {MYSQL_DATABASE}")
-        print(f"Database '{MYSQL_DATABASE}' dropped.")
+        # Increments start and stop on student boundaries, so no student is split between two of them
+        start = student_boundary(data, SIZES[i - 1]) if INCREMENTAL and i > 0 else 0
+        stop = student_boundary(data, size)
+
+        # Restoring the loaded data from a snapshot, or ingesting it (and saving a snapshot)
+        key = snapshot_key(normalized_dataset if NORMALIZED else dataset, size,
+                           "normalized" if NORMALIZED else "denormalized", LOAD_MODE) if SNAPSHOTS else None
+        ingest_time = restore_snapshot('mysql', key, MYSQL_HOST) if key else None
+        restored = ingest_time is not None
+        reset_time = 0
+        if not restored:
+            # Dropping and recreating the database and tables
+            if start == 0:
+                reset_time = reset_database(cursor)
+
+            # Inserting data
+            ingest_time = ingest(connection, cursor, data, start, stop)
+            if key:
+                save_snapshot('mysql', key, MYSQL_HOST)
+
+        # Reconnecting after the container restart of a snapshot
+        if key:
+            connection = connect_to_db()
+            cursor = connection.cursor()
+
+        # Running the queries once per index variant when comparing them
+        for variant in (INDEX_VARIANTS if COMPARE_INDEX_VARIANTS else [None]):
+            variant_info = {}
+            if variant:
+                build_time, index_size = apply_index_variant(cursor, variant)
+                variant_info = {"Index Variant": variant, "Index Build Time (s)": build_time, "Index Size (MB)": index_size}
+
+            # Running experiments for each query
+            for query_name, query_func in {
+                "query_1": query_1,
+                "query_2": query_2,
+                "query_3": query_3,
+                "query_4": query_4
+            }.items():
+                print(f"Running {query_name} for {size} records...")
+                if variant:
+                    plans.append({
+                        "Records": size, "Query": query_name, "Index Variant": variant,
+                        "Explain JSON": json.dumps(explain_query(cursor, query_name))
+                    })
+                if LARGE_RESULT_MODE:
+                    execution_times, first_execution_time, avg_execution_time, stream_info = run_streaming_experiments(
+                        lambda: stream_query(connection, query_name))
+                else:
+                    execution_times, first_execution_time, avg_execution_time = run_experiments(cursor, query_func)
+                    stream_info = {}
+
+                # Capturing the plan after the timings, so it does not warm up the first execution
+                plan_info = capture_plan(cursor, query_name) if CAPTURE_PLANS or variant else {}
+                result_rows, result_bytes = result_size(cursor, query_name)
+
+                # Adding results to the DataFrame
+                results.append({
+                    "Records": size,
+                    "Query": query_name,
+                    "First Execution Time (ms)": first_execution_time,
+                    "Average Execution Time (ms)": avg_execution_time,
+                    "Result Rows": result_rows,
+                    "Result Bytes": result_bytes,
+                    **stream_info,
+                    "Ingested Records": stop - start,
+                    "Ingest Time (s)": ingest_time,
+                    "Ingest Rows/s": (stop - start) / ingest_time,
+                    "Restored From Snapshot": restored,
+                    "Reset Time (s)": reset_time,
+                    **variant_info,
+                    **plan_info
+                })
+
+        # Going back to the loaded schema before the next increment
+        if COMPARE_INDEX_VARIANTS and INCREMENTAL:
+            apply_index_variant(cursor, "fk_only")
+
+    # Dropping the database
+    cursor.execute(f"DROP DATABASE IF EXISTS {MYSQL_DATABASE}")
+    print(f"Database '{MYSQL_DATABASE}' dropped.")
 
     # Saving results to an Excel file
     output_file = os.path.join(output_dir, "mysql_query_execution_times.xlsx")
@@ -258,6 +669,22 @@ def main():
     results_df.to_excel(output_file, index=False)
     print(f"Results saved to {output_file}")
 
+    # Saving the index variants side by side: timings and plan summaries per variant, and the full plans
+    if COMPARE_INDEX_VARIANTS:
+        variants_file = os.path.join(output_dir, "mysql_index_variants.xlsx")
+        with pd.ExcelWriter(variants_file) as writer:
+            results_df.pivot_table(
+                index=["Records", "Query"], columns="Index Variant", values="Average Execution Time (ms)"
+            ).to_excel(writer, sheet_name="Timings")
+            results_df.pivot_table(
+                index=["Records", "Query"], columns="Index Variant", values="Plan Summary", aggfunc="first"
+            ).to_excel(writer, sheet_name="Plans")
+            results_df.pivot_table(
+                index="Records", columns="Index Variant", values=["Index Build Time (s)", "Index Size (MB)"]
+            ).to_excel(writer, sheet_name="Index Cost")
+            pd.DataFrame(plans).to_excel(writer, sheet_name="Explain JSON", index=False)
+        print(f"Index variant comparison saved to {variants_file}")
+
     # Closing the MySQL connection
     cursor.close()
     connection.close()
@@ -0,0 +1,95 @@
+import os
+import shutil
+from cms_snapshot import dataset_hash
+from cms_dataset import read_dataset, slice_records, read_normalized_dataset, slice_normalized, split_records
+
+# Dataset path: the generated CSV, or a Parquet/Arrow file written with output_format in faker_code_1mil.py
+DATASET = '1_mil_records.csv'
+
+# Normalized export (export_mode = "normalized" in faker_code_1mil.py): read the per-table files instead of DATASET
+NORMALIZED = False
+NORMALIZED_DATASET = '1_mil_records_{table}.csv'
+
+# Sizes to write import files for; every size gets its own directory under IMPORT_DIR, keyed by the content hash of
+# the dataset so regenerated data never reuses stale files (e.g. neo4j_import/<hash>/250000)
+SIZES = [250000, 500000, 750000, 1000000]
+IMPORT_DIR = 'neo4j_import'
+
+# Node files for `neo4j-admin database import`: label -> (table, column -> header). The :ID columns are also stored
+# as the node properties the benchmark queries use, and need --id-type=INTEGER to keep them as integers
+NODE_FILES = {
+    'Course': ('courses', {
+        'course_id': 'course_id:ID(Course)',
+        'course_name': 'course_name',
+        'course_content': 'course_content'
+    }),
+    'Student': ('students', {
+        'student_id': 'student_id:ID(Student)',
+        'student_name': 'student_name',
+        'student_email_address': 'student_email_address'
+    }),
+    'Professor': ('professors', {
+        'professor_id': 'professor_id:ID(Professor)',
+        'professor_name': 'professor_name',
+        'professor_email_address': 'professor_email_address'
+    }),
+    'Assignment': ('assignments', {
+        'assignment_id': 'assignment_id:ID(Assignment)',
+        'assignment_title': 'assignment_title',
+        'submission_status': 'submission_status',
+        'score': 'score:int'
+    })
+}
+
+# Relationship files: type -> (table, column -> header), matching the edges created by neo4jcms1mil.py
+RELATIONSHIP_FILES = {
+    'ENROLLED_IN': ('students', {'student_id': ':START_ID(Student)', 'course_id': ':END_ID(Course)'}),
+    'TEACHES': ('professors', {'professor_id': ':START_ID(Professor)', 'course_id': ':END_ID(Course)'}),
+    'SUBMITTED': ('assignments', {'student_id': ':START_ID(Student)', 'assignment_id': ':END_ID(Assignment)'})
+}
+
+# Function to get the import directory of a size of a dataset (a path, glob or normalized '{table}' pattern)
+def import_directory(size, dataset):
+    return os.path.join(IMPORT_DIR, dataset_hash(dataset)[:16], str(size))
+
+# Function to write the node and relationship files of the normalized tables into `directory`. The files are written
+# to a temporary directory first, so an interrupted write never leaves a directory that looks complete
+def write_import_files(tables, directory):
+    partial = directory + ".tmp"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    for name, (table, headers) in {**NODE_FILES, **RELATIONSHIP_FILES}.items():
+        df = tables[table][list(headers)].rename(columns=headers)
+        df.to_csv(os.path.join(partial, f"{name.lower()}.csv"), index=False)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(partial, directory)
+    print(f"Import files for {len(tables['students'])} students written to {directory}")
+
+# Function to get the neo4j-admin arguments naming the files of an import directory (as seen by neo4j-admin)
+def import_arguments(directory):
+    return (
+        [f"--nodes={label}={directory}/{label.lower()}.csv" for label in NODE_FILES] +
+        [f"--relationships={rel_type}={directory}/{rel_type.lower()}.csv" for rel_type in RELATIONSHIP_FILES] +
+        ["--id-type=INTEGER"]
+    )
+
+# Function to get the normalized tables of the first `size` records
+def tables_for_size(data, size, normalized=NORMALIZED):
+    return slice_normalized(data, 0, size) if normalized else split_records(slice_records(data, 0, size))
+
+def main():
+    # Loading the dataset
+    if NORMALIZED:
+        data = read_normalized_dataset(NORMALIZED_DATASET)
+    else:
+        data = read_dataset(DATASET)
+
+    for size in SIZES:
+        directory = import_directory(size, NORMALIZED_DATASET if NORMALIZED else DATASET)
+        write_import_files(tables_for_size(data, size), directory)
+
+    print("Import with: neo4j-admin database import full neo4j --overwrite-destination " +
+          " ".join(import_arguments(f"{os.path.dirname(directory)}/<size>")))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
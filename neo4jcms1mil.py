@@ -1,17 +1,146 @@
 from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable
 import pandas as pd
 import time
 import os
+import subprocess
 import numpy as np
+from cms_dataset import read_dataset, slice_records, read_normalized_dataset, slice_normalized, split_records, student_boundary
+from neo4j_import_files import import_directory, write_import_files, import_arguments, tables_for_size
+from cms_snapshot import snapshot_key, save_snapshot, restore_snapshot, run_on_volume, wait_for_port
 
 # Neo4j Connection
-NEO4J_URI = "bolt://localhost:7687"
+NEO4J_HOST = "localhost"
+NEO4J_URI = f"bolt://{NEO4J_HOST}:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "dbpasscms"
 
+# Dataset path: the generated CSV, or a Parquet/Arrow file written with output_format in faker_code_1mil.py
 DATASET = '1_mil_records.csv'
 NUM_EXPERIMENTS = 31
 
+# Benchmark sizes. With INCREMENTAL the loaded data is kept between sizes and only the records
+# [previous size, size) are appended, instead of tearing down and reloading every size from scratch
+# (the "import" mode always imports the full size)
+SIZES = [250000, 500000, 750000, 1000000]
+INCREMENTAL = False
+
+# Snapshot cache (cms_snapshot.py): after ingest the Neo4j volume is saved under a key of the dataset hash, the
+# size and the schema variant, and later runs restore it instead of re-ingesting. Needs docker access to the container
+SNAPSHOTS = False
+
+# Normalized export (export_mode = "normalized" in faker_code_1mil.py): load the per-table files instead of DATASET
+NORMALIZED = False
+NORMALIZED_DATASET = '1_mil_records_{table}.csv'
+
+# Ingest mode: "create" (CREATE for every node of every batch, relationships matched by label scan), "merge"
+# (uniqueness constraints first, courses and professors MERGEd once, relationships created through the constraint
+# indexes inside CALL { ... } IN TRANSACTIONS of TRANSACTION_SIZE rows) or "import" (offline neo4j-admin import of
+# the files written by neo4j_import_files.py into the stopped container, which is then started on the new store)
+LOAD_MODE = "create"
+TRANSACTION_SIZE = 10000
+
+# Container and image used by the "import" mode (see docker-compose.yml)
+NEO4J_CONTAINER = "neo4j_cms"
+NEO4J_IMAGE = "neo4j:latest"
+STARTUP_TIMEOUT = 120
+
+# Reset before a full load: "batched" (DETACH DELETE in CALL { ... } IN TRANSACTIONS of TRANSACTION_SIZE rows, so the
+# delete never has to fit in one transaction) or "wipe" (the store of the neo4j database is removed from the stopped
+# container, which creates an empty one on startup; constraints and indexes go with it)
+RESET_MODE = "batched"
+
+# Plan capture: after the timings of every (query, size), PROFILE the query once and record its operators, db hits,
+# rows and index seeks next to the timings
+CAPTURE_PLANS = True
+
+# Longest text Excel keeps in a cell
+EXCEL_CELL_LIMIT = 32767
+
+# Cypher used to insert each batch of nodes and their relationships
+CREATE_COURSES = """
+UNWIND $courses AS course
+CREATE (c:Course {course_id: course.course_id, course_name: course.course_name, course_content: course.course_content})
+"""
+
+CREATE_STUDENTS = """
+UNWIND $students AS student
+CREATE (s:Student {student_id: student.student_id, student_name: student.student_name, student_email_address: student.student_email_address})
+WITH s, student
+MATCH (c:Course {course_id: student.course_id})
+CREATE (s)-[:ENROLLED_IN]->(c)
+"""
+
+CREATE_PROFESSORS = """
+UNWIND $professors AS professor
+CREATE (p:Professor {professor_id: professor.professor_id, professor_name: professor.professor_name, professor_email_address: professor.professor_email_address})
+WITH p, professor
+MATCH (c:Course {course_id: professor.course_id})
+CREATE (p)-[:TEACHES]->(c)
+"""
+
+CREATE_ASSIGNMENTS = """
+UNWIND $assignments AS assignment
+CREATE (a:Assignment {assignment_id: assignment.assignment_id, assignment_title: assignment.assignment_title, submission_status: assignment.submission_status, score: assignment.score})
+WITH a, assignment
+MATCH (s:Student {student_id: assignment.student_id})
+CREATE (s)-[:SUBMITTED]->(a)
+"""
+
+# Uniqueness constraints created before a "merge" load; each one also backs the index used by the lookups
+CONSTRAINTS = [
+    "CREATE CONSTRAINT course_id IF NOT EXISTS FOR (c:Course) REQUIRE c.course_id IS UNIQUE",
+    "CREATE CONSTRAINT student_id IF NOT EXISTS FOR (s:Student) REQUIRE s.student_id IS UNIQUE",
+    "CREATE CONSTRAINT professor_id IF NOT EXISTS FOR (p:Professor) REQUIRE p.professor_id IS UNIQUE",
+    "CREATE CONSTRAINT assignment_id IF NOT EXISTS FOR (a:Assignment) REQUIRE a.assignment_id IS UNIQUE"
+]
+
+# Statements dropping those constraints again, so a "create" or "normalized" load after a "merge" run does not hit them
+DROP_CONSTRAINTS = [
+    f"DROP CONSTRAINT {constraint.split()[2]} IF EXISTS" for constraint in CONSTRAINTS
+]
+
+# Cypher used by the "merge" loader. Each statement runs as an auto-commit transaction, as CALL IN TRANSACTIONS needs
+MERGE_COURSES = """
+UNWIND $courses AS course
+CALL {
+    WITH course
+    MERGE (c:Course {course_id: course.course_id})
+    ON CREATE SET c.course_name = course.course_name, c.course_content = course.course_content
+} IN TRANSACTIONS OF $transaction_size ROWS
+"""
+
+MERGE_STUDENTS = """
+UNWIND $students AS student
+CALL {
+    WITH student
+    MATCH (c:Course {course_id: student.course_id})
+    CREATE (s:Student {student_id: student.student_id, student_name: student.student_name, student_email_address: student.student_email_address})
+    CREATE (s)-[:ENROLLED_IN]->(c)
+} IN TRANSACTIONS OF $transaction_size ROWS
+"""
+
+MERGE_PROFESSORS = """
+UNWIND $professors AS professor
+CALL {
+    WITH professor
+    MATCH (c:Course {course_id: professor.course_id})
+    MERGE (p:Professor {professor_id: professor.professor_id})
+    ON CREATE SET p.professor_name = professor.professor_name, p.professor_email_address = professor.professor_email_address
+    MERGE (p)-[:TEACHES]->(c)
+} IN TRANSACTIONS OF $transaction_size ROWS
+"""
+
+MERGE_ASSIGNMENTS = """
+UNWIND $assignments AS assignment
+CALL {
+    WITH assignment
+    MATCH (s:Student {student_id: assignment.student_id})
+    CREATE (a:Assignment {assignment_id: assignment.assignment_id, assignment_title: assignment.assignment_title, submission_status: assignment.submission_status, score: assignment.score})
+    CREATE (s)-[:SUBMITTED]->(a)
+} IN TRANSACTIONS OF $transaction_size ROWS
+"""
+
 class Neo4jCMS:
     # Function to connect to Neo4j database
     def __init__(self, uri, user, password):
@@ -20,11 +149,38 @@ class Neo4jCMS:
     def close(self):
         self.driver.close()
 
-    # Function to create the database
+    # Function to clear the database with RESET_MODE and return the reset time in seconds
     def clear_database(self):
-        with self.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
-        print("Database cleared.")
+        start_time = time.time()
+        if RESET_MODE == "wipe":
+            run_on_volume(NEO4J_CONTAINER, "rm -rf /data/databases/neo4j /data/transactions/neo4j")
+            wait_for_port(NEO4J_HOST, 7687)
+            self.wait_for_bolt()
+        else:
+            with self.driver.session() as session:
+                session.run(
+                    "MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $transaction_size ROWS",
+                    transaction_size=TRANSACTION_SIZE
+                ).consume()
+                # DETACH DELETE keeps the schema, so the merge constraints only stay for the loader that uses them
+                if LOAD_MODE != "merge":
+                    for constraint in DROP_CONSTRAINTS:
+                        session.run(constraint).consume()
+        reset_time = time.time() - start_time
+        print(f"Database cleared in {reset_time:.2f} s.")
+        return reset_time
+
+    # Function to wait for Bolt to accept connections again after a container restart
+    def wait_for_bolt(self):
+        deadline = time.time() + STARTUP_TIMEOUT
+        while True:
+            try:
+                self.driver.verify_connectivity()
+                break
+            except ServiceUnavailable:
+                if time.time() > deadline:
+                    raise
+                time.sleep(1)
 
     # Function to insert data into each tables
     def insert_batch_data(self, df, batch_size=10000):
@@ -35,48 +191,106 @@ class Neo4jCMS:
                     batch = df.iloc[i:i+batch_size]
                     
                     # Inserting courses in batches
-                    session.run("""
-                    UNWIND $courses AS course
-                    CREATE (c:Course {course_id: course.course_id, course_name: course.course_name, course_content: course.course_content})
-                    """, courses=batch[['course_id', 'course_name', 'course_content']].to_dict(orient='records'))
+                    session.run(CREATE_COURSES, courses=batch[['course_id', 'course_name', 'course_content']].to_dict(orient='records'))
 
                     # Inserting students in batches
-                    session.run("""
-                    UNWIND $students AS student
-                    CREATE (s:Student {student_id: student.student_id, student_name: student.student_name, student_email_address: student.student_email_address})
-                    WITH s, student
-                    MATCH (c:Course {course_id: student.course_id})
-                    CREATE (s)-[:ENROLLED_IN]->(c)
-                    """, students=batch[['student_id', 'student_name', 'student_email_address', 'course_id']].to_dict(orient='records'))
+                    session.run(CREATE_STUDENTS, students=batch[['student_id', 'student_name', 'student_email_address', 'course_id']].to_dict(orient='records'))
 
                     # Inserting professors in batches
-                    session.run("""
-                    UNWIND $professors AS professor
-                    CREATE (p:Professor {professor_id: professor.professor_id, professor_name: professor.professor_name, professor_email_address: professor.professor_email_address})
-                    WITH p, professor
-                    MATCH (c:Course {course_id: professor.course_id})
-                    CREATE (p)-[:TEACHES]->(c)
-                    """, professors=batch[['professor_id', 'professor_name', 'professor_email_address', 'course_id']].to_dict(orient='records'))
+                    session.run(CREATE_PROFESSORS, professors=batch[['professor_id', 'professor_name', 'professor_email_address', 'course_id']].to_dict(orient='records'))
 
                     # Inserting assignments in batches
-                    session.run("""
-                    UNWIND $assignments AS assignment
-                    CREATE (a:Assignment {assignment_id: assignment.assignment_id, assignment_title: assignment.assignment_title, submission_status: assignment.submission_status, score: assignment.score})
-                    WITH a, assignment
-                    MATCH (s:Student {student_id: assignment.student_id})
-                    CREATE (s)-[:SUBMITTED]->(a)
-                    """, assignments=batch[['assignment_id', 'assignment_title', 'submission_status', 'score', 'student_id', 'course_id']].to_dict(orient='records'))
+                    session.run(CREATE_ASSIGNMENTS, assignments=batch[['assignment_id', 'assignment_title', 'submission_status', 'score', 'student_id', 'course_id']].to_dict(orient='records'))
                     
             except Exception as e:
                 print(f"Error during batch insertion: {e}")
             else:
                 print(f"Batch data inserted for {len(df)} records.")
 
-    # Function to run the query and measure the execution times
+    # Function to insert the normalized tables, creating each course node once before the nodes that link to it
+    def insert_normalized_data(self, tables, batch_size=10000):
+        with self.driver.session() as session:
+            try:
+                for query, table in [
+                    (CREATE_COURSES, 'courses'),
+                    (CREATE_STUDENTS, 'students'),
+                    (CREATE_PROFESSORS, 'professors'),
+                    (CREATE_ASSIGNMENTS, 'assignments')
+                ]:
+                    records = tables[table].to_dict(orient='records')
+                    for i in range(0, len(records), batch_size):
+                        session.run(query, {table: records[i:i + batch_size]}).consume()
+            except Exception as e:
+                print(f"Error during batch insertion: {e}")
+            else:
+                print(f"Normalized data inserted for {len(tables['students'])} students.")
+
+    # Function to create the uniqueness constraints and wait for their indexes to come online
+    def create_constraints(self):
+        with self.driver.session() as session:
+            for constraint in CONSTRAINTS:
+                session.run(constraint).consume()
+            session.run("CALL db.awaitIndexes()").consume()
+        print("Constraints created.")
+
+    # Function to load deduplicated tables with the "merge" Cypher, so every lookup is a unique index seek
+    def insert_merged_data(self, tables, batch_size=100000):
+        self.create_constraints()
+        with self.driver.session() as session:
+            try:
+                for query, table in [
+                    (MERGE_COURSES, 'courses'),
+                    (MERGE_STUDENTS, 'students'),
+                    (MERGE_PROFESSORS, 'professors'),
+                    (MERGE_ASSIGNMENTS, 'assignments')
+                ]:
+                    records = tables[table].to_dict(orient='records')
+                    for i in range(0, len(records), batch_size):
+                        session.run(query, {table: records[i:i + batch_size], 'transaction_size': TRANSACTION_SIZE}).consume()
+            except Exception as e:
+                print(f"Error during merged insertion: {e}")
+            else:
+                print(f"Merged data inserted for {len(tables['students'])} students.")
+
+    # Function to replace the store of the container with an offline import of `directory`. neo4j-admin runs in a
+    # throwaway container sharing the volumes of the stopped database container
+    def import_store(self, directory):
+        subprocess.run(["docker", "stop", NEO4J_CONTAINER], check=True)
+        subprocess.run([
+            "docker", "run", "--rm", "--volumes-from", NEO4J_CONTAINER, "-v", f"{os.path.abspath(directory)}:/import",
+            NEO4J_IMAGE, "neo4j-admin", "database", "import", "full", "neo4j", "--overwrite-destination",
+            *import_arguments("/import")
+        ], check=True)
+        subprocess.run(["docker", "start", NEO4J_CONTAINER], check=True)
+        self.wait_for_bolt()
+        print(f"Store imported from {directory}.")
+
+    # Function to load the records [start, stop) with the configured LOAD_MODE and return the elapsed seconds
+    def ingest(self, data, start, stop):
+        start_time = time.time()
+
+        if LOAD_MODE == "import":
+            # Files are reused only for the same dataset content, as the directory is keyed by its hash
+            directory = import_directory(stop, NORMALIZED_DATASET if NORMALIZED else DATASET)
+            if not os.path.isdir(directory):
+                write_import_files(tables_for_size(data, stop, NORMALIZED), directory)
+            self.import_store(directory)
+        elif LOAD_MODE == "merge":
+            self.insert_merged_data(slice_normalized(data, start, stop) if NORMALIZED else split_records(slice_records(data, start, stop)))
+        elif NORMALIZED:
+            self.insert_normalized_data(slice_normalized(data, start, stop))
+        else:
+            self.insert_batch_data(slice_records(data, start, stop))
+
+        ingest_time = time.time() - start_time
+        print(f"Ingested {stop - start} records in {ingest_time:.2f} s ({(stop - start) / ingest_time:.0f} rows/s).")
+        return ingest_time
+
+    # Function to run the query and measure the execution times, up to the last record of its result
     def run_query(self, query, params=None):
         with self.driver.session() as session:
             start_time = time.time()
-            session.run(query, params or {})
+            list(session.run(query, params or {}))
             end_time = time.time()
         return (end_time - start_time) * 1000  # Return execution time in milliseconds
 
@@ -92,12 +306,46 @@ class Neo4jCMS:
         avg_execution_time = np.mean(execution_times[1:]) # Average of the 30 execution times
         return execution_times, first_execution_time, avg_execution_time
 
+    # Function to count the records and bytes of a query's results over one more execution. The driver does not count
+    # the bytes it receives, so the bytes are the UTF-8 size of the returned values
+    def result_size(self, query, params=None):
+        with self.driver.session() as session:
+            records = list(session.run(query, params or {}))
+        return len(records), sum(len(str(value).encode()) for record in records for value in record.values())
+
+    # Function to capture the plan of a query once by running it with PROFILE
+    def capture_plan(self, query, params=None):
+        with self.driver.session() as session:
+            profile = session.run("PROFILE " + query, params or {}).consume().profile
+
+        operators = []
+
+        # Walking the operator tree, keeping every operator with its depth, rows, db hits and details
+        def walk(operator, depth):
+            operators.append((depth, operator["operatorType"].split("@")[0], operator.get("rows", 0),
+                              operator.get("dbHits", 0), operator.get("args", {}).get("Details", "")))
+            for child in operator.get("children", []):
+                walk(child, depth + 1)
+
+        walk(profile, 0)
+        return {
+            "Plan Summary": " <- ".join(name for _, name, _, _, _ in operators),
+            "DB Hits": sum(db_hits for _, _, _, db_hits, _ in operators),
+            "Rows": profile.get("rows", 0),
+            "Indexes Used": ", ".join(f"{name}({details})" for _, name, _, _, details in operators if "Index" in name),
+            "Execution Plan": "\n".join(f"{'  ' * depth}{name} rows={rows} dbHits={db_hits} {details}"
+                                         for depth, name, rows, db_hits, details in operators)[:EXCEL_CELL_LIMIT]
+        }
+
 def main():
     # Connecting to Neo4j
     db = Neo4jCMS(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
     
     #Loading the dataset
-    data = pd.read_csv(DATASET)
+    if NORMALIZED:
+        data = read_normalized_dataset(NORMALIZED_DATASET)
+    else:
+        data = read_dataset(DATASET)
     
     # Creating output directory
     output_dir = "/app/output"
@@ -107,13 +355,30 @@ def main():
     results = []
 
     # Running for different data sizes
-    for size in [250000, 500000, 750000, 1000000]:
+    for i, size in enumerate(SIZES):
         print(f"Running experiments for {size} records...")
-        df_subset = data.iloc[:size]
+        # Increments start and stop on student boundaries, so no student is split between two of them
+        start = student_boundary(data, SIZES[i - 1]) if INCREMENTAL and i > 0 and LOAD_MODE != "import" else 0
+        stop = student_boundary(data, size)
         
-        # Creating the database and inserting data into the tables
-        db.clear_database()
-        db.insert_batch_data(df_subset)
+        # Restoring the loaded data from a snapshot, or ingesting it (and saving a snapshot)
+        key = snapshot_key(NORMALIZED_DATASET if NORMALIZED else DATASET, size,
+                           "normalized" if NORMALIZED else "denormalized", LOAD_MODE) if SNAPSHOTS else None
+        ingest_time = restore_snapshot('neo4j', key, NEO4J_HOST) if key else None
+        restored = ingest_time is not None
+        reset_time = 0
+        if not restored:
+            # Clearing the database and inserting data into the tables
+            if LOAD_MODE != "import" and start == 0:
+                reset_time = db.clear_database()
+            ingest_time = db.ingest(data, start, stop)
+            if key:
+                save_snapshot('neo4j', key, NEO4J_HOST)
+
+        # Reconnecting after the container restart of a snapshot
+        if key:
+            db.close()
+            db = Neo4jCMS(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
 
         queries = {
             "Query 1": """
@@ -153,13 +418,25 @@ def main():
         for query_name, query in queries.items():
             print(f"Running {query_name} for {size} records...")
             execution_times, first_execution_time, avg_execution_time = db.run_experiments(query)
+
+            # Capturing the plan after the timings, so it does not warm up the first execution
+            plan_info = db.capture_plan(query) if CAPTURE_PLANS else {}
+            result_rows, result_bytes = db.result_size(query)
             
             # Adding results to the Dataframe
             results.append({
                 "Records": size,
                 "Query": query_name,
                 "First Execution Time (ms)": first_execution_time,
-                "Average Execution Time (ms)": avg_execution_time
+                "Average Execution Time (ms)": avg_execution_time,
+                "Result Rows": result_rows,
+                "Result Bytes": result_bytes,
+                "Ingested Records": stop - start,
+                "Ingest Time (s)": ingest_time,
+                "Ingest Rows/s": (stop - start) / ingest_time,
+                "Restored From Snapshot": restored,
+                "Reset Time (s)": reset_time,
+                **plan_info
             })
     
     # Saving results to an Excel file
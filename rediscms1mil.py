@@ -3,15 +3,64 @@ import redis
 import time
 import os
 import numpy as np
+import shutil
+import socket
+import subprocess
+from cms_dataset import read_dataset, slice_records, read_normalized_dataset, slice_normalized, split_records, student_boundary
+from cms_snapshot import snapshot_key, save_snapshot, restore_snapshot
 
 # Redis connection
 REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
 REDIS_DB = 0
 
+# Dataset path: the generated CSV, or a Parquet/Arrow file written with output_format in faker_code_1mil.py
 dataset = '1_mil_records.csv'
 NUM_EXPERIMENTS = 31
 
+# Benchmark sizes. With INCREMENTAL the loaded data is kept between sizes and only the records
+# [previous size, size) are appended, instead of tearing down and reloading every size from scratch
+SIZES = [250000, 500000, 750000, 1000000]
+INCREMENTAL = False
+
+# Snapshot cache (cms_snapshot.py): after ingest the Redis volume is saved under a key of the dataset hash, the
+# size and the schema variant, and later runs restore it instead of re-ingesting. Needs docker access to the container
+SNAPSHOTS = False
+
+# Normalized export (export_mode = "normalized" in faker_code_1mil.py): load the per-table files instead of `dataset`
+NORMALIZED = False
+normalized_dataset = '1_mil_records_{table}.csv'
+
+# Ingest mode: "pipeline" (transactional redis-py pipeline per 1000 records), "resp_socket" (RESP encoded from the
+# column arrays and streamed over a raw socket, RESP_BATCH_SIZE commands per round trip) or "resp_file" (the same
+# RESP written to RESP_FILE and fed to `redis-cli --pipe`)
+LOAD_MODE = "pipeline"
+RESP_BATCH_SIZE = 10000
+RESP_FILE = "redis_mass_insert.resp"
+
+# Secondary index hash kept by every loader, so a lookup by course name is a single HGET
+COURSE_NAME_INDEX = "index:course_name"
+
+# Composite score index kept next to course:{id}:scores: one sorted set per course and submission status, scored
+# by the assignment score, with "{assignment_id}:{student_id}" members so a range read also yields the student
+def status_scores_key(course_id, submission_status):
+    return f"course:{course_id}:status:{submission_status}:scores"
+
+# Data layout: "hashes" (one hash per student, professor and assignment and a set per student's assignments) or
+# "bucketed" (those entities packed into fields of listpack-encoded bucket hashes of BUCKET_SIZE ids, loaded with the
+# RESP mass insert of LOAD_MODE and queried with the pipelined compact queries)
+LAYOUT = "hashes"
+BUCKET_SIZE = 100
+LISTPACK_VALUE_SIZE = 256
+FIELD_SEPARATOR = "\x1f"
+
+# Keys sampled with MEMORY USAGE for the memory report of every size
+MEMORY_SAMPLES = 1000
+
+# Query execution: "client" (one round trip per key), "pipeline" (every hop of a query fetched with one pipelined
+# batch of HGET/HMGET calls) or "lua" (the multi-hop queries run server-side as Lua scripts called with EVALSHA)
+QUERY_MODE = "client"
+
 # Function to connect to Redis
 def connect_to_db():
     r = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
@@ -24,6 +73,7 @@ def insert_batch_data(r, df, batch_size=1000):
     for i, row in df.iterrows():
         # Inserting Courses data
         pipeline.hset(f"course:{row['course_id']}", mapping={"course_name": row['course_name'], "course_content": row['course_content']})
+        pipeline.hset(COURSE_NAME_INDEX, row['course_name'], row['course_id'])
         
         # Inserting Students data
         pipeline.hset(f"student:{row['student_id']}", mapping={
@@ -52,6 +102,7 @@ def insert_batch_data(r, df, batch_size=1000):
         # Indexing assignments by student and score
         pipeline.sadd(f"student:{row['student_id']}:assignments", row['assignment_id'])
         pipeline.zadd(f"course:{row['course_id']}:scores", {row['assignment_id']: row['score']})
+        pipeline.zadd(status_scores_key(row['course_id'], row['submission_status']), {f"{row['assignment_id']}:{row['student_id']}": row['score']})
 
         # Executing batch every `batch_size` records
         if (i + 1) % batch_size == 0:
@@ -60,6 +111,278 @@ def insert_batch_data(r, df, batch_size=1000):
     # Executing any remaining commands after the loop
     pipeline.execute()
 
+# Function to insert the normalized tables with the same keys and indexes as `insert_batch_data`
+def insert_normalized_batch_data(r, tables, batch_size=1000):
+    pipeline = r.pipeline()
+
+    for row in tables['courses'].itertuples(index=False):
+        pipeline.hset(f"course:{row.course_id}", mapping={"course_name": row.course_name, "course_content": row.course_content})
+        pipeline.hset(COURSE_NAME_INDEX, row.course_name, row.course_id)
+    pipeline.execute()
+
+    for i, row in enumerate(tables['students'].itertuples(index=False)):
+        pipeline.hset(f"student:{row.student_id}", mapping={
+            "student_name": row.student_name, 
+            "student_email_address": row.student_email_address, 
+            "course_id": row.course_id
+        })
+        # Indexing students by course
+        pipeline.sadd(f"course:{row.course_id}:students", row.student_id)
+        if (i + 1) % batch_size == 0:
+            pipeline.execute()
+    pipeline.execute()
+
+    for i, row in enumerate(tables['professors'].itertuples(index=False)):
+        pipeline.hset(f"professor:{row.professor_id}", mapping={
+            "professor_name": row.professor_name, 
+            "professor_email_address": row.professor_email_address, 
+            "course_id": row.course_id
+        })
+        if (i + 1) % batch_size == 0:
+            pipeline.execute()
+    pipeline.execute()
+
+    for i, row in enumerate(tables['assignments'].itertuples(index=False)):
+        pipeline.hset(f"assignment:{row.assignment_id}", mapping={
+            "assignment_title": row.assignment_title, 
+            "submission_status": row.submission_status, 
+            "score": row.score, 
+            "student_id": row.student_id, 
+            "course_id": row.course_id
+        })
+        # Indexing assignments by student and score
+        pipeline.sadd(f"student:{row.student_id}:assignments", row.assignment_id)
+        pipeline.zadd(f"course:{row.course_id}:scores", {row.assignment_id: row.score})
+        pipeline.zadd(status_scores_key(row.course_id, row.submission_status), {f"{row.assignment_id}:{row.student_id}": row.score})
+        if (i + 1) % batch_size == 0:
+            pipeline.execute()
+    pipeline.execute()
+
+# Function to encode one command in the RESP protocol
+def encode_command(*args):
+    encoded = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = str(arg).encode()
+        encoded.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(encoded)
+
+# Function to generate the RESP-encoded HSET/SADD/ZADD commands of `insert_batch_data` from the column arrays
+def resp_commands(tables):
+    courses = tables['courses']
+    for course_id, course_name, course_content in zip(
+        courses['course_id'].tolist(), courses['course_name'].tolist(), courses['course_content'].tolist()
+    ):
+        yield encode_command("HSET", f"course:{course_id}", "course_name", course_name, "course_content", course_content)
+        yield encode_command("HSET", COURSE_NAME_INDEX, course_name, course_id)
+
+    students = tables['students']
+    for student_id, student_name, student_email_address, course_id in zip(
+        students['student_id'].tolist(), students['student_name'].tolist(),
+        students['student_email_address'].tolist(), students['course_id'].tolist()
+    ):
+        yield encode_command(
+            "HSET", f"student:{student_id}",
+            "student_name", student_name, "student_email_address", student_email_address, "course_id", course_id
+        )
+        # Indexing students by course
+        yield encode_command("SADD", f"course:{course_id}:students", student_id)
+
+    professors = tables['professors']
+    for professor_id, professor_name, professor_email_address, course_id in zip(
+        professors['professor_id'].tolist(), professors['professor_name'].tolist(),
+        professors['professor_email_address'].tolist(), professors['course_id'].tolist()
+    ):
+        yield encode_command(
+            "HSET", f"professor:{professor_id}",
+            "professor_name", professor_name, "professor_email_address", professor_email_address, "course_id", course_id
+        )
+
+    assignments = tables['assignments']
+    for assignment_id, assignment_title, submission_status, score, student_id, course_id in zip(
+        assignments['assignment_id'].tolist(), assignments['assignment_title'].tolist(),
+        assignments['submission_status'].tolist(), assignments['score'].tolist(),
+        assignments['student_id'].tolist(), assignments['course_id'].tolist()
+    ):
+        yield encode_command(
+            "HSET", f"assignment:{assignment_id}",
+            "assignment_title", assignment_title, "submission_status", submission_status,
+            "score", score, "student_id", student_id, "course_id", course_id
+        )
+        # Indexing assignments by student and score
+        yield encode_command("SADD", f"student:{student_id}:assignments", assignment_id)
+        yield encode_command("ZADD", f"course:{course_id}:scores", score, assignment_id)
+        yield encode_command("ZADD", status_scores_key(course_id, submission_status), score, f"{assignment_id}:{student_id}")
+
+# Function to get the bucket hash holding an entity in the "bucketed" layout
+def bucket_key(kind, entity_id):
+    return f"{kind}:b:{int(entity_id) // BUCKET_SIZE}"
+
+# Function to pack the scalar fields of an entity into one hash value, and to unpack them
+def pack(*values):
+    return FIELD_SEPARATOR.join(map(str, values))
+
+def unpack(value):
+    return value.split(FIELD_SEPARATOR) if value is not None else None
+
+# Function to generate the RESP-encoded commands of the "bucketed" layout: every student, professor and assignment
+# is one packed field of a bucket hash, and each student's assignment ids are one comma-separated field. Course
+# hashes, the course student sets and the indexes keep the keys of `resp_commands`
+def compact_commands(tables):
+    courses = tables['courses']
+    for course_id, course_name, course_content in zip(
+        courses['course_id'].tolist(), courses['course_name'].tolist(), courses['course_content'].tolist()
+    ):
+        yield encode_command("HSET", f"course:{course_id}", "course_name", course_name, "course_content", course_content)
+        yield encode_command("HSET", COURSE_NAME_INDEX, course_name, course_id)
+
+    students = tables['students']
+    for student_id, student_name, student_email_address, course_id in zip(
+        students['student_id'].tolist(), students['student_name'].tolist(),
+        students['student_email_address'].tolist(), students['course_id'].tolist()
+    ):
+        yield encode_command("HSET", bucket_key("student", student_id), student_id, pack(student_name, student_email_address, course_id))
+        yield encode_command("SADD", f"course:{course_id}:students", student_id)
+
+    professors = tables['professors']
+    for professor_id, professor_name, professor_email_address, course_id in zip(
+        professors['professor_id'].tolist(), professors['professor_name'].tolist(),
+        professors['professor_email_address'].tolist(), professors['course_id'].tolist()
+    ):
+        yield encode_command("HSET", bucket_key("professor", professor_id), professor_id, pack(professor_name, professor_email_address, course_id))
+
+    assignments = tables['assignments']
+    for assignment_id, assignment_title, submission_status, score, student_id, course_id in zip(
+        assignments['assignment_id'].tolist(), assignments['assignment_title'].tolist(),
+        assignments['submission_status'].tolist(), assignments['score'].tolist(),
+        assignments['student_id'].tolist(), assignments['course_id'].tolist()
+    ):
+        yield encode_command(
+            "HSET", bucket_key("assignment", assignment_id), assignment_id,
+            pack(assignment_title, submission_status, score, student_id, course_id)
+        )
+        yield encode_command("ZADD", f"course:{course_id}:scores", score, assignment_id)
+        yield encode_command("ZADD", status_scores_key(course_id, submission_status), score, f"{assignment_id}:{student_id}")
+
+    # Assignment ids of each student
+    student_assignments = assignments.groupby('student_id')['assignment_id'].agg(lambda ids: ",".join(map(str, ids)))
+    for student_id, assignment_ids in student_assignments.items():
+        yield encode_command("HSET", bucket_key("student_assignments", student_id), student_id, assignment_ids)
+
+# Function to raise the listpack limits so every bucket hash stays listpack-encoded; returns the previous limits
+def configure_compact_layout(r):
+    limits = r.config_get("hash-max-listpack-*")
+    r.config_set("hash-max-listpack-entries", BUCKET_SIZE)
+    r.config_set("hash-max-listpack-value", LISTPACK_VALUE_SIZE)
+    return limits
+
+# Function to set the listpack limits back to those returned by configure_compact_layout
+def restore_listpack_limits(r, limits):
+    for name, value in limits.items():
+        r.config_set(name, value)
+
+# Function to check that a sampled student bucket is listpack-encoded
+def buckets_listpack_encoded(r):
+    bucket = next(r.scan_iter(match="student:b:*", count=1000), None)
+    return bucket is None or r.object("encoding", bucket) == "listpack"
+
+# Function to stream the commands over a raw socket in non-transactional batches, reading the replies of each batch
+def mass_insert_socket(commands):
+    with socket.create_connection((REDIS_HOST, REDIS_PORT)) as sock:
+        batch = [encode_command("SELECT", REDIS_DB)]
+        sent = 0
+
+        def flush():
+            sock.sendall(b"".join(batch))
+            # Every reply to SELECT/HSET/SADD/ZADD is a single line: an integer, +OK or an -error
+            replies = b""
+            while replies.count(b"\r\n") < len(batch):
+                chunk = sock.recv(1 << 16)
+                if not chunk:
+                    raise ConnectionError("Redis closed the connection during the mass insert.")
+                replies += chunk
+            errors = [line for line in replies.split(b"\r\n") if line.startswith(b"-")]
+            if errors:
+                raise redis.ResponseError(errors[0][1:].decode())
+            batch.clear()
+
+        for command in commands:
+            batch.append(command)
+            if len(batch) >= RESP_BATCH_SIZE:
+                sent += len(batch)
+                flush()
+        sent += len(batch)
+        flush()
+    print(f"Mass insert sent {sent} commands over the socket.")
+
+# Function to write the commands to RESP_FILE and load it with `redis-cli --pipe`, which has to be installed
+def mass_insert_file(commands):
+    with open(RESP_FILE, 'wb') as f:
+        f.write(encode_command("SELECT", REDIS_DB))
+        for command in commands:
+            f.write(command)
+    print(f"RESP commands written to {RESP_FILE}.")
+
+    # Failing instead of benchmarking a database the file was never loaded into
+    if shutil.which("redis-cli") is None:
+        raise FileNotFoundError(
+            f"redis-cli not found; install it or load the file with: redis-cli -h {REDIS_HOST} -p {REDIS_PORT} --pipe < {RESP_FILE}"
+        )
+    with open(RESP_FILE, 'rb') as f:
+        subprocess.run(["redis-cli", "-h", REDIS_HOST, "-p", str(REDIS_PORT), "--pipe"], stdin=f, check=True)
+
+# Function to load the records [start, stop) in the configured LOAD_MODE and return the ingest time in seconds
+def ingest(r, data, start, stop):
+    start_time = time.time()
+
+    if LAYOUT == "bucketed":
+        tables = slice_normalized(data, start, stop) if NORMALIZED else split_records(slice_records(data, start, stop))
+        if LOAD_MODE == "resp_file":
+            mass_insert_file(compact_commands(tables))
+        else:
+            mass_insert_socket(compact_commands(tables))
+    elif LOAD_MODE in ("resp_socket", "resp_file"):
+        tables = slice_normalized(data, start, stop) if NORMALIZED else split_records(slice_records(data, start, stop))
+        if LOAD_MODE == "resp_socket":
+            mass_insert_socket(resp_commands(tables))
+        else:
+            mass_insert_file(resp_commands(tables))
+    elif NORMALIZED:
+        insert_normalized_batch_data(r, slice_normalized(data, start, stop))
+    else:
+        insert_batch_data(r, slice_records(data, start, stop))
+
+    ingest_time = time.time() - start_time
+    print(f"Ingested {stop - start} records in {ingest_time:.2f} s ({(stop - start) / ingest_time:.0f} rows/s).")
+    return ingest_time
+
+# Function to report the memory footprint of the loaded data: INFO memory plus MEMORY USAGE of a random key sample,
+# broken down by key prefix
+def memory_report(r, records, samples=MEMORY_SAMPLES):
+    info = r.info("memory")
+    keys = r.dbsize()
+
+    pipeline = r.pipeline(transaction=False)
+    for _ in range(min(samples, keys)):
+        pipeline.randomkey()
+    sampled_keys = [key for key in pipeline.execute() if key]
+    usages = pipelined(r, "memory_usage", [(key,) for key in sampled_keys])
+
+    by_prefix = {}
+    for key, usage in zip(sampled_keys, usages):
+        by_prefix.setdefault(key.split(":")[0], []).append(usage or 0)
+    for prefix, prefix_usages in sorted(by_prefix.items()):
+        print(f"  {prefix}: ~{np.mean(prefix_usages):.0f} bytes/key over {len(prefix_usages)} sampled keys")
+
+    report = {
+        "Keys": keys,
+        "Used Memory (MB)": info["used_memory"] / 2 ** 20,
+        "Dataset Memory (MB)": info["used_memory_dataset"] / 2 ** 20,
+        "Sampled Bytes/Key": np.mean([usage or 0 for usage in usages]) if usages else 0,
+        "Bytes/Record": info["used_memory_dataset"] / records
+    }
+    print(f"Memory: {report['Used Memory (MB)']:.1f} MB used, {keys} keys, {report['Bytes/Record']:.0f} bytes/record.")
+    return report
+
 # Function to run the query and measure execution times
 def run_query(r, query_func):
     start_time = time.time()
@@ -67,6 +390,18 @@ def run_query(r, query_func):
     end_time = time.time()
     return (end_time - start_time) * 1000  # return time in milliseconds
 
+# Function to get the bytes the server has written to its clients
+def net_output_bytes(r):
+    return r.info("stats")["total_net_output_bytes"]
+
+# Function to count the rows and bytes of a query's results over one more execution. Every reply is read in full, so
+# the bytes are the server's total_net_output_bytes delta less the replies of the INFO calls, measured by reading it twice
+def result_size(r, query_func):
+    sent_before = net_output_bytes(r)
+    info_reply = net_output_bytes(r) - sent_before
+    rows = len(query_func(r))
+    return rows, net_output_bytes(r) - sent_before - 2 * info_reply
+
 # Function to get first and average execution times
 def run_experiments(r, query_func, num_experiments=NUM_EXPERIMENTS):
     first_execution_time = run_query(r, query_func)
@@ -81,10 +416,20 @@ def run_experiments(r, query_func, num_experiments=NUM_EXPERIMENTS):
     return execution_times, first_execution_time, avg_execution_time
 
 # Query functions for Redis
+# Function to resolve a course name to its id through the course name index
+def course_id_by_name(r, course_name):
+    return r.hget(COURSE_NAME_INDEX, course_name)
+
+# Function to queue the update of an assignment's status and score, moving it between the score indexes
+def update_assignment(pipeline, aid, student_id, course_id, old_status, submission_status, score):
+    pipeline.hset(f"assignment:{aid}", mapping={"submission_status": submission_status, "score": score})
+    pipeline.zadd(f"course:{course_id}:scores", {aid: score})
+    pipeline.zrem(status_scores_key(course_id, old_status), f"{aid}:{student_id}")
+    pipeline.zadd(status_scores_key(course_id, submission_status), {f"{aid}:{student_id}": score})
+
 def query_1(r):
     # Query 1: Getting students in "Data Analysis" course
-    course_keys = [key for key in r.keys("course:*") if r.type(key) == "hash"]
-    course_id = next((key.split(":")[1] for key in course_keys if r.hget(key, "course_name") == "Data Analysis"), None)
+    course_id = course_id_by_name(r, "Data Analysis")
     if course_id:
         student_ids = r.smembers(f"course:{course_id}:students")
         students = [{"student_id": sid, "student_name": r.hget(f"student:{sid}", "student_name")} for sid in student_ids]
@@ -92,16 +437,15 @@ def query_1(r):
     return []
 
 def query_2(r):
-    # Query 2: Getting students in "Data Analysis" course with submission status 'yes'
-    course_keys = [key for key in r.keys("course:*") if r.type(key) == "hash"]
-    course_id = next((key.split(":")[1] for key in course_keys if r.hget(key, "course_name") == "Data Analysis"), None)
+    # Query 2: Getting students in "Data Analysis" course with submission status 'Yes'
+    course_id = course_id_by_name(r, "Data Analysis")
     if course_id:
         student_ids = r.smembers(f"course:{course_id}:students")
         students = []
         for sid in student_ids:
             assignment_ids = r.smembers(f"student:{sid}:assignments")
             for aid in assignment_ids:
-                if r.hget(f"assignment:{aid}", "submission_status") == "yes":
+                if r.hget(f"assignment:{aid}", "submission_status") == "Yes":
                     students.append({"student_id": sid, "student_name": r.hget(f"student:{sid}", "student_name")})
                     break
         return students[:10]
@@ -112,7 +456,10 @@ def query_3(r):
     for student_id in ["540214", "533994"]:
         assignment_ids = r.smembers(f"student:{student_id}:assignments")
         for aid in assignment_ids:
-            r.hset(f"assignment:{aid}", mapping={"submission_status": "Yes", "score": 30})
+            old_status, course_id = r.hmget(f"assignment:{aid}", ["submission_status", "course_id"])
+            pipeline = r.pipeline()
+            update_assignment(pipeline, aid, student_id, course_id, old_status, "Yes", 30)
+            pipeline.execute()
 
     # Fetching updated student and assignment data
     result = []
@@ -133,14 +480,13 @@ def query_3(r):
     return result
 
 def query_4(r):
-    # Query 4: Getting students with submission_status 'yes' and score > 26 in "Data Analysis"
-    course_keys = [key for key in r.keys("course:*") if r.type(key) == "hash"]
-    course_id = next((key.split(":")[1] for key in course_keys if r.hget(key, "course_name") == "Data Analysis"), None)
+    # Query 4: Getting students with submission_status 'Yes' and score > 26 in "Data Analysis"
+    course_id = course_id_by_name(r, "Data Analysis")
     if course_id:
         assignment_ids = r.zrangebyscore(f"course:{course_id}:scores", 27, "+inf")
         result = []
         for aid in assignment_ids:
-            if r.hget(f"assignment:{aid}", "submission_status") == "yes":
+            if r.hget(f"assignment:{aid}", "submission_status") == "Yes":
                 student_id = r.hget(f"assignment:{aid}", "student_id")
                 result.append({
                     "student_id": student_id,
@@ -153,10 +499,260 @@ def query_4(r):
         return result
     return []
 
+# Lua scripts running the multi-hop queries server-side in one round trip; each is loaded once with SCRIPT LOAD and
+# called with EVALSHA. They read the keys named by their arguments, which is fine on a single (non-cluster) server
+QUERY_SCRIPTS = {
+    "query_2": """
+        local result = {}
+        for _, sid in ipairs(redis.call('SMEMBERS', 'course:' .. ARGV[1] .. ':students')) do
+            for _, aid in ipairs(redis.call('SMEMBERS', 'student:' .. sid .. ':assignments')) do
+                if redis.call('HGET', 'assignment:' .. aid, 'submission_status') == ARGV[2] then
+                    table.insert(result, {sid, redis.call('HGET', 'student:' .. sid, 'student_name')})
+                    break
+                end
+            end
+            if #result >= tonumber(ARGV[3]) then
+                break
+            end
+        end
+        return result
+    """,
+    "query_3": """
+        for _, sid in ipairs(ARGV) do
+            for _, aid in ipairs(redis.call('SMEMBERS', 'student:' .. sid .. ':assignments')) do
+                local old = redis.call('HMGET', 'assignment:' .. aid, 'submission_status', 'course_id')
+                local course = 'course:' .. old[2]
+                redis.call('HSET', 'assignment:' .. aid, 'submission_status', 'Yes', 'score', 30)
+                redis.call('ZADD', course .. ':scores', 30, aid)
+                redis.call('ZREM', course .. ':status:' .. old[1] .. ':scores', aid .. ':' .. sid)
+                redis.call('ZADD', course .. ':status:Yes:scores', 30, aid .. ':' .. sid)
+            end
+        end
+
+        local result = {}
+        for _, sid in ipairs(ARGV) do
+            local student = redis.call('HMGET', 'student:' .. sid, 'student_name', 'course_id')
+            local course_name = student[2] and redis.call('HGET', 'course:' .. student[2], 'course_name')
+            for _, aid in ipairs(redis.call('SMEMBERS', 'student:' .. sid .. ':assignments')) do
+                local assignment = redis.call('HMGET', 'assignment:' .. aid, 'submission_status', 'score')
+                table.insert(result, {sid, student[1], student[2], course_name, assignment[1], assignment[2]})
+            end
+        end
+        return result
+    """,
+    "query_4": """
+        local result = {}
+        local course_name = redis.call('HGET', 'course:' .. ARGV[1], 'course_name')
+        local index = 'course:' .. ARGV[1] .. ':status:' .. ARGV[3] .. ':scores'
+        local members = redis.call('ZRANGEBYSCORE', index, ARGV[2], '+inf', 'WITHSCORES')
+        for i = 1, #members, 2 do
+            local student_id = string.match(members[i], ':(.*)$')
+            local student_name = redis.call('HGET', 'student:' .. student_id, 'student_name')
+            table.insert(result, {student_id, student_name, course_name, ARGV[3], members[i + 1]})
+        end
+        return result
+    """
+}
+
+# SHA1 of every loaded script
+script_shas = {}
+
+# Function to load the query scripts into the server's script cache
+def load_scripts(r):
+    for name, script in QUERY_SCRIPTS.items():
+        script_shas[name] = r.script_load(script)
+
+# Function to call a loaded script, loading the scripts again if the server lost them (e.g. after a restart)
+def run_script(r, name, *args):
+    try:
+        return r.evalsha(script_shas[name], 0, *args)
+    except (KeyError, redis.exceptions.NoScriptError):
+        load_scripts(r)
+        return r.evalsha(script_shas[name], 0, *args)
+
+def query_2_lua(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        return [{"student_id": sid, "student_name": name} for sid, name in run_script(r, "query_2", course_id, "Yes", 10)]
+    return []
+
+def query_3_lua(r):
+    return [
+        {
+            "student_id": sid, "student_name": name, "course_id": course_id, "course_name": course_name,
+            "submission_status": submission_status, "score": score
+        }
+        for sid, name, course_id, course_name, submission_status, score in run_script(r, "query_3", "540214", "533994")
+    ]
+
+def query_4_lua(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        return [
+            {
+                "student_id": student_id, "student_name": name, "course_id": course_id, "course_name": course_name,
+                "submission_status": submission_status, "score": score
+            }
+            for student_id, name, course_name, submission_status, score in run_script(r, "query_4", course_id, 27, "Yes")
+        ]
+    return []
+
+# Function to run the same command for every argument tuple in one pipelined round trip
+def pipelined(r, command, args_list):
+    pipeline = r.pipeline(transaction=False)
+    for args in args_list:
+        getattr(pipeline, command)(*args)
+    return pipeline.execute()
+
+# Pipelined variants: every hop of a query is one batch of HGET/HMGET/SMEMBERS calls instead of one call per key
+def query_1_pipeline(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        student_ids = list(r.smembers(f"course:{course_id}:students"))[:10]
+        names = pipelined(r, "hget", [(f"student:{sid}", "student_name") for sid in student_ids])
+        return [{"student_id": sid, "student_name": name} for sid, name in zip(student_ids, names)]
+    return []
+
+def query_2_pipeline(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        student_ids = list(r.smembers(f"course:{course_id}:students"))
+        assignment_sets = pipelined(r, "smembers", [(f"student:{sid}:assignments",) for sid in student_ids])
+        pairs = [(sid, aid) for sid, assignment_ids in zip(student_ids, assignment_sets) for aid in assignment_ids]
+        statuses = pipelined(r, "hget", [(f"assignment:{aid}", "submission_status") for _, aid in pairs])
+
+        matched = list(dict.fromkeys(sid for (sid, _), status in zip(pairs, statuses) if status == "Yes"))[:10]
+        names = pipelined(r, "hget", [(f"student:{sid}", "student_name") for sid in matched])
+        return [{"student_id": sid, "student_name": name} for sid, name in zip(matched, names)]
+    return []
+
+def query_3_pipeline(r):
+    student_ids = ["540214", "533994"]
+    assignment_sets = pipelined(r, "smembers", [(f"student:{sid}:assignments",) for sid in student_ids])
+    pairs = [(i, aid) for i, assignment_ids in enumerate(assignment_sets) for aid in assignment_ids]
+    old = pipelined(r, "hmget", [(f"assignment:{aid}", ["submission_status", "course_id"]) for _, aid in pairs])
+    pipeline = r.pipeline()
+    for (i, aid), (old_status, course_id) in zip(pairs, old):
+        update_assignment(pipeline, aid, student_ids[i], course_id, old_status, "Yes", 30)
+    pipeline.execute()
+
+    # Fetching updated student and assignment data
+    students = pipelined(r, "hmget", [(f"student:{sid}", ["student_name", "course_id"]) for sid in student_ids])
+    course_names = pipelined(r, "hget", [(f"course:{course_id}", "course_name") for _, course_id in students])
+    assignments = pipelined(r, "hmget", [(f"assignment:{aid}", ["submission_status", "score"]) for _, aid in pairs])
+    return [
+        {
+            "student_id": student_ids[i], "student_name": students[i][0], "course_id": students[i][1],
+            "course_name": course_names[i], "submission_status": submission_status, "score": score
+        }
+        for (i, _), (submission_status, score) in zip(pairs, assignments)
+    ]
+
+def query_4_pipeline(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        # One range read of the composite index, then one pipelined batch for the student names and the course
+        members = r.zrangebyscore(status_scores_key(course_id, "Yes"), 27, "+inf", withscores=True)
+        student_ids = [member.split(":")[1] for member, _ in members]
+        pipeline = r.pipeline(transaction=False)
+        for student_id in student_ids:
+            pipeline.hget(f"student:{student_id}", "student_name")
+        pipeline.hget(f"course:{course_id}", "course_name")
+        *names, course_name = pipeline.execute()
+        return [
+            {
+                "student_id": student_id, "student_name": name, "course_id": course_id, "course_name": course_name,
+                "submission_status": "Yes", "score": str(int(score))
+            }
+            for student_id, name, (_, score) in zip(student_ids, names, members)
+        ]
+    return []
+
+# Query functions of each QUERY_MODE
+QUERY_FUNCTIONS = {
+    "client": {"query_1": query_1, "query_2": query_2, "query_3": query_3, "query_4": query_4},
+    "pipeline": {"query_1": query_1_pipeline, "query_2": query_2_pipeline, "query_3": query_3_pipeline, "query_4": query_4_pipeline},
+    "lua": {"query_1": query_1_pipeline, "query_2": query_2_lua, "query_3": query_3_lua, "query_4": query_4_lua}
+}
+
+# Queries over the "bucketed" layout, fetching each hop with one pipelined batch of bucket HGETs
+def bucket_fields(r, kind, entity_ids):
+    return pipelined(r, "hget", [(bucket_key(kind, entity_id), entity_id) for entity_id in entity_ids])
+
+def query_1_compact(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        student_ids = list(r.smembers(f"course:{course_id}:students"))[:10]
+        students = bucket_fields(r, "student", student_ids)
+        return [{"student_id": sid, "student_name": unpack(student)[0]} for sid, student in zip(student_ids, students)]
+    return []
+
+def query_2_compact(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        student_ids = list(r.smembers(f"course:{course_id}:students"))
+        assignment_lists = bucket_fields(r, "student_assignments", student_ids)
+        pairs = [(sid, aid) for sid, assignment_ids in zip(student_ids, assignment_lists) if assignment_ids
+                 for aid in assignment_ids.split(",")]
+        assignments = bucket_fields(r, "assignment", [aid for _, aid in pairs])
+
+        matched = list(dict.fromkeys(sid for (sid, _), assignment in zip(pairs, assignments) if unpack(assignment)[1] == "Yes"))[:10]
+        students = bucket_fields(r, "student", matched)
+        return [{"student_id": sid, "student_name": unpack(student)[0]} for sid, student in zip(matched, students)]
+    return []
+
+def query_3_compact(r):
+    student_ids = ["540214", "533994"]
+    assignment_lists = bucket_fields(r, "student_assignments", student_ids)
+    pairs = [(i, aid) for i, assignment_ids in enumerate(assignment_lists) if assignment_ids for aid in assignment_ids.split(",")]
+    assignments = [unpack(assignment) for assignment in bucket_fields(r, "assignment", [aid for _, aid in pairs])]
+
+    # Rewriting the packed assignments and moving them between the score indexes
+    pipeline = r.pipeline()
+    for (i, aid), (title, old_status, _, student_id, course_id) in zip(pairs, assignments):
+        pipeline.hset(bucket_key("assignment", aid), aid, pack(title, "Yes", 30, student_id, course_id))
+        pipeline.zadd(f"course:{course_id}:scores", {aid: 30})
+        pipeline.zrem(status_scores_key(course_id, old_status), f"{aid}:{student_id}")
+        pipeline.zadd(status_scores_key(course_id, "Yes"), {f"{aid}:{student_id}": 30})
+    pipeline.execute()
+
+    # Fetching updated student and assignment data
+    students = [unpack(student) for student in bucket_fields(r, "student", student_ids)]
+    course_names = pipelined(r, "hget", [(f"course:{student[2]}", "course_name") for student in students])
+    assignments = [unpack(assignment) for assignment in bucket_fields(r, "assignment", [aid for _, aid in pairs])]
+    return [
+        {
+            "student_id": student_ids[i], "student_name": students[i][0], "course_id": students[i][2],
+            "course_name": course_names[i], "submission_status": submission_status, "score": score
+        }
+        for (i, _), (_, submission_status, score, _, _) in zip(pairs, assignments)
+    ]
+
+def query_4_compact(r):
+    course_id = course_id_by_name(r, "Data Analysis")
+    if course_id:
+        members = r.zrangebyscore(status_scores_key(course_id, "Yes"), 27, "+inf", withscores=True)
+        student_ids = [member.split(":")[1] for member, _ in members]
+        students = bucket_fields(r, "student", student_ids)
+        course_name = r.hget(f"course:{course_id}", "course_name")
+        return [
+            {
+                "student_id": student_id, "student_name": unpack(student)[0], "course_id": course_id,
+                "course_name": course_name, "submission_status": "Yes", "score": str(int(score))
+            }
+            for student_id, student, (_, score) in zip(student_ids, students, members)
+        ]
+    return []
+
+COMPACT_QUERY_FUNCTIONS = {"query_1": query_1_compact, "query_2": query_2_compact, "query_3": query_3_compact, "query_4": query_4_compact}
+
 # Main function
 def main():
     # Loading dataset
-    data = pd.read_csv(dataset)
+    if NORMALIZED:
+        data = read_normalized_dataset(normalized_dataset)
+    else:
+        data = read_dataset(dataset)
 
     # Connecting to Redis
     r = connect_to_db()
@@ -169,36 +765,82 @@ def main():
     results = []
 
     # Run experiments for different sizes
-    for i, size in enumerate([250000, 500000, 750000, 1000000]):
+    for i, size in enumerate(SIZES):
         print(f"Running experiments for {size} records...")
+        # Increments start and stop on student boundaries, so no student is split between two of them
+        start = student_boundary(data, SIZES[i - 1]) if INCREMENTAL and i > 0 else 0
+        stop = student_boundary(data, size)
+
+        # Raising the listpack limits for the bucketed layout before the load or the restore; they are set back after
+        # this size, so later runs (the "hashes" layout included) get the server's own limits
+        limits = configure_compact_layout(r) if LAYOUT == "bucketed" else {}
+
+        # Restoring the loaded data from a snapshot, or ingesting it (and saving a snapshot)
+        key = snapshot_key(normalized_dataset if NORMALIZED else dataset, size,
+                           "normalized" if NORMALIZED else "denormalized", LOAD_MODE, LAYOUT) if SNAPSHOTS else None
+        ingest_time = restore_snapshot('redis', key, REDIS_HOST) if key else None
+        restored = ingest_time is not None
+
+        # The container restart of a restore loads the RDB under the server's own limits, which can convert the
+        # buckets to hashtables; such a snapshot is loaded again from the dataset instead
+        if restored and LAYOUT == "bucketed":
+            r = connect_to_db()
+            configure_compact_layout(r)
+            if not buckets_listpack_encoded(r):
+                print("Restored buckets are not listpack-encoded; loading them from the dataset instead.")
+                restored, start = False, 0
+        reset_time = 0
+        if not restored:
+            # Clearing Redis database before inserting new records; with ASYNC the keys are freed in a background
+            # thread instead of blocking the server
+            if start == 0:
+                reset_start = time.time()
+                r.flushdb(asynchronous=True)
+                reset_time = time.time() - reset_start
+                print(f"Redis database cleared in {reset_time:.2f} s.")
+
+            # Inserting batch data into Redis
+            ingest_time = ingest(r, data, start, stop)
+            if key:
+                save_snapshot('redis', key, REDIS_HOST)
 
-        # Clearing Redis database before inserting new records
-        r.flushdb()
-        print(f"Redis database cleared.")
+        # Reconnecting after the container restart of a snapshot, which also resets the listpack limits
+        if key:
+            r = connect_to_db()
+            if LAYOUT == "bucketed":
+                configure_compact_layout(r)
 
-        df_subset = data.iloc[:size]
+        # Loading the query scripts before the first timed execution
+        if QUERY_MODE == "lua":
+            load_scripts(r)
 
-        # Inserting batch data into Redis
-        insert_batch_data(r, df_subset)
+        # Reporting the memory footprint of this size
+        memory = memory_report(r, size)
 
         # Running experiments for each query
-        for query_name, query_func in {
-            "query_1": query_1,
-            "query_2": query_2,
-            "query_3": query_3,
-            "query_4": query_4
-        }.items():
+        query_functions = COMPACT_QUERY_FUNCTIONS if LAYOUT == "bucketed" else QUERY_FUNCTIONS[QUERY_MODE]
+        for query_name, query_func in query_functions.items():
             print(f"Running {query_name} for {size} records...")
             execution_times, first_execution_time, avg_execution_time = run_experiments(r, query_func)
+            result_rows, result_bytes = result_size(r, query_func)
 
             # Adding results to the DataFrame
             results.append({
                 "Records": size,
                 "Query": query_name,
                 "First Execution Time (ms)": first_execution_time,
-                "Average Execution Time (ms)": avg_execution_time
+                "Average Execution Time (ms)": avg_execution_time,
+                "Result Rows": result_rows,
+                "Result Bytes": result_bytes,
+                "Ingested Records": stop - start,
+                "Ingest Time (s)": ingest_time,
+                "Ingest Rows/s": (stop - start) / ingest_time,
+                "Restored From Snapshot": restored,
+                "Reset Time (s)": reset_time,
+                **memory
             })
 
+        restore_listpack_limits(r, limits)
         print(f"Experiment for {size} records completed.")
 
     # Saving results to an Excel file